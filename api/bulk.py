@@ -0,0 +1,116 @@
+from typing import Awaitable, Callable
+
+from fastapi import Body
+from sqlalchemy import Insert
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette import status
+
+from dto.bulk_dto import BulkItemResult, BulkResponse
+
+# Teto de itens por requisição: mantém a transação e as listas do IN
+# abaixo do limite de variáveis do SQLite.
+BULK_LIMIT = 10_000
+
+
+def bulk_body():
+    return Body(min_length=1, max_length=BULK_LIMIT)
+
+
+# Uma única consulta com IN para todos os valores (ids, e-mails)
+# referenciados no lote.
+async def existing_values(session: AsyncSession, column, ids) -> set:
+    if not ids:
+        return set()
+    statement = select(column).where(column.in_(set(ids)))
+    return set((await session.exec(statement)).all())
+
+
+def failure(index: int, status_code: int, detail: str) -> BulkItemResult:
+    return BulkItemResult(index=index, status_code=status_code,
+                          detail=detail)
+
+
+# (colunas da chave única, status, detail) e a revalidação descritos em
+# insert_valid().
+Conflict = tuple[tuple[str, ...], int, str]
+Revalidate = Callable[[list[tuple[int, dict]]],
+                      Awaitable[tuple[list[tuple[int, dict]], list]]]
+
+
+async def _insert_rows(session: AsyncSession, statement: Insert,
+                       rows: list[tuple[int, dict]], returning: bool,
+                       conflict: Conflict | None) -> tuple[list, list]:
+    values = [row for _, row in rows]
+    table = statement.table
+    if conflict is not None:
+        columns, status_code, detail = conflict
+        result = await session.exec(
+            statement.returning(*(table.c[column] for column in columns),
+                                *([table.c.id] if returning else [])),
+            params=values)
+        inserted = {tuple(row[:len(columns)]): row[-1] if returning else None
+                    for row in result.all()}
+        created, skipped = [], []
+        for index, row in rows:
+            key = tuple(row[column] for column in columns)
+            if key in inserted:
+                created.append((index, inserted[key]))
+            else:
+                skipped.append(failure(index, status_code, detail))
+        return created, skipped
+    if returning:
+        result = await session.exec(statement.returning(table.c.id),
+                                    params=values)
+        ids = sorted(result.scalars().all())
+    else:
+        await session.exec(statement, params=values)
+        ids = [None] * len(rows)
+    return list(zip((index for index, _ in rows), ids)), []
+
+
+# Insere as linhas válidas num único executemany (INSERT de várias linhas).
+# Com `returning`, os ids gerados são associados a cada item: o SQLite
+# atribui rowids crescentes na ordem do VALUES, então basta ordená-los. O
+# sort_by_parameter_order do SQLAlchemy faria o mesmo, mas, sem coluna
+# sentinela, inserindo uma linha por instrução.
+#
+# As verificações do lote são feitas antes do INSERT, e outra transação
+# pode mudar o banco nesse intervalo; nenhum dos casos derruba o lote:
+# - `conflict` = (colunas da chave única, status, detail): a instrução deve
+#   ignorar conflitos (ON CONFLICT DO NOTHING), e as linhas puladas são
+#   recusadas no seu item. Os itens inseridos são reconhecidos pela chave
+#   no RETURNING.
+# - `revalidate`: chamada com as linhas depois de uma IntegrityError (ex.:
+#   o projeto foi removido), devolve as que continuam válidas e as falhas
+#   das demais; o INSERT é repetido só com as válidas.
+async def insert_valid(session: AsyncSession, statement: Insert,
+                       rows: list[tuple[int, dict]], failures: list,
+                       returning: bool = True,
+                       conflict: Conflict | None = None,
+                       revalidate: Revalidate | None = None) -> BulkResponse:
+    items = list(failures)
+    created = []
+    while rows:
+        try:
+            created, skipped = await _insert_rows(session, statement, rows,
+                                                  returning, conflict)
+            await session.commit()
+        except IntegrityError:
+            await session.rollback()
+            if revalidate is None:
+                raise
+            rows, stale = await revalidate(rows)
+            if not stale:
+                raise
+            items += stale
+            continue
+        items += skipped
+        break
+    items += [BulkItemResult(index=index,
+                             status_code=status.HTTP_201_CREATED, id=id)
+              for index, id in created]
+    items.sort(key=lambda item: item.index)
+    return BulkResponse(created=len(created),
+                        failed=len(items) - len(created), items=items)
@@ -0,0 +1,93 @@
+import functools
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Response
+from starlette import status
+
+from services.cache import cache_version
+
+
+# Validadores de um GET: a ETag é um hash dos parâmetros da rota e das
+# partes devolvidas pelo validador (ids, contagens, updated_at/changed_at),
+# calculadas numa consulta indexada sem montar o payload.
+def make_etag(key: str, parts) -> str:
+    digest = hashlib.blake2b(repr((key, parts)).encode(),
+                             digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def http_date(moment: datetime) -> str:
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return format_datetime(moment.astimezone(timezone.utc), usegmt=True)
+
+
+def _strip_weak(tag: str) -> str:
+    return tag.strip().removeprefix("W/")
+
+
+# If-None-Match tem precedência; If-Modified-Since só vale sem ele, com a
+# resolução de um segundo do cabeçalho HTTP.
+def not_modified(headers, etag: str,
+                 last_modified: datetime | None) -> bool:
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = {_strip_weak(tag) for tag in if_none_match.split(",")}
+        return "*" in tags or _strip_weak(etag) in tags
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    if last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    return last_modified.replace(microsecond=0) <= since
+
+
+# GET condicional. `validator(**kwargs)` devolve (partes da ETag,
+# last_modified) ou None quando o recurso não existe, deixando a rota
+# responder o 404. Fica acima de @cached, para que a resposta 304 não
+# dependa do cache, e exige os parâmetros `request` e `response` na rota.
+# A ETag entra na chave de um @cached abaixo (cache_version): o corpo em
+# cache é sempre de uma leitura feita depois do validador, nunca anterior.
+# O validador roda antes da leitura: se uma escrita cair entre os dois, a
+# ETag enviada é a antiga e o cliente apenas baixa de novo na próxima vez.
+def conditional(validator):
+    def decorator(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(**kwargs):
+            validated = await validator(**kwargs)
+            if validated is None:
+                return await endpoint(**kwargs)
+            parts, last_modified = validated
+            params = sorted((name, value) for name, value in kwargs.items()
+                            if isinstance(value, (str, int, float, bool))
+                            or value is None)
+            headers = {"ETag": make_etag(
+                f"{endpoint.__module__}.{endpoint.__name__}",
+                (params, parts))}
+            if last_modified is not None:
+                headers["Last-Modified"] = http_date(last_modified)
+            if not_modified(kwargs["request"].headers, headers["ETag"],
+                            last_modified):
+                return Response(status_code=status.HTTP_304_NOT_MODIFIED,
+                                headers=headers)
+            token = cache_version.set(headers["ETag"])
+            try:
+                result = await endpoint(**kwargs)
+            finally:
+                cache_version.reset(token)
+            if isinstance(result, Response):
+                if result.status_code == status.HTTP_200_OK:
+                    result.headers.update(headers)
+            else:
+                kwargs["response"].headers.update(headers)
+            return result
+        return wrapper
+    return decorator
@@ -0,0 +1,45 @@
+from fastapi import HTTPException
+from sqlalchemy import UpdateBase
+from sqlalchemy.exc import IntegrityError
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from services.write_batcher import batcher
+
+UNIQUE = "UNIQUE constraint failed: "
+FOREIGN_KEY = "FOREIGN KEY constraint failed"
+
+
+# Restrição violada, como o SQLite a descreve: "collaborator.email",
+# "assignment.task_id, assignment.collaborator_id" (chave primária) ou
+# "FOREIGN KEY", que não diz qual das chaves estrangeiras falhou.
+def violated_constraint(error: IntegrityError) -> str:
+    message = str(error.orig)
+    if message.startswith(UNIQUE):
+        return message.removeprefix(UNIQUE)
+    if message.startswith(FOREIGN_KEY):
+        return "FOREIGN KEY"
+    return message
+
+
+# Escrita em uma instrução mais o commit, confiando nas restrições do banco
+# em vez de consultar antes: sem a corrida entre a verificação e a escrita.
+# `errors` mapeia a restrição violada para (status, detail); as demais são
+# relançadas após o rollback. Devolve a linha do RETURNING, se houver. Com
+# WRITE_BATCHING, a instrução vai para o escritor em lote em vez da sessão.
+async def execute_write(session: AsyncSession, statement: UpdateBase,
+                        errors: dict[str, tuple[int, str]] | None = None):
+    try:
+        if batcher is not None:
+            return await batcher.submit(statement)
+        result = await session.exec(statement)
+        row = (result.mappings().one_or_none() if statement.exported_columns
+               else None)
+        await session.commit()
+    except IntegrityError as error:
+        await session.rollback()
+        mapped = (errors or {}).get(violated_constraint(error))
+        if mapped is None:
+            raise
+        raise HTTPException(status_code=mapped[0],
+                            detail=mapped[1]) from None
+    return row
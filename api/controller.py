@@ -1,9 +1,13 @@
 from fastapi import APIRouter
 
+from services.changefeed import CHANGEFEED
+
 from .routes.project import router as project_router
 from .routes.task import router as task_router
 from .routes.collaborator import router as collaborator_router
 from .routes.statistic import router as statistic_router
+from .routes.export import router as export_router
+from .routes.events import router as events_router
 
 api_router = APIRouter()
 
@@ -13,3 +17,7 @@ api_router.include_router(collaborator_router, prefix="/collaborators",
                           tags=["Collaborator"])
 api_router.include_router(statistic_router, prefix="/statistic",
                           tags=["Statistic"])
+api_router.include_router(export_router, prefix="/export", tags=["Export"])
+if CHANGEFEED:
+    api_router.include_router(events_router, prefix="/events",
+                              tags=["Events"])
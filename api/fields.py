@@ -0,0 +1,69 @@
+from fastapi import HTTPException
+from sqlalchemy import Select, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette import status
+
+from api.responses import fetch_rows
+
+
+# Seleção esparsa: `fields=name,status,tasks.name` restringe as colunas do
+# item (e, com o prefixo, as dos filhos); `include=tasks` escolhe quais
+# relações são carregadas. Sem os dois parâmetros, vale o formato completo
+# de sempre: as colunas de `base` (os campos do response_model, quando ele
+# não expõe todas as colunas de `model`) e todas as colunas das relações.
+def parse_fields(fields: str | None, model, relations: dict[str, type],
+                 base=None) -> dict[str | None, list]:
+    selected = {}
+    for name in filter(None, (part.strip()
+                              for part in (fields or "").split(","))):
+        relation, _, field = name.rpartition(".")
+        target = relations.get(relation) if relation else model
+        if target is None or field not in target.__table__.columns:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                                detail=f"Unknown field '{name}'.")
+        columns = selected.setdefault(relation or None, [target.id])
+        if getattr(target, field) not in columns:
+            columns.append(getattr(target, field))
+    if None not in selected:
+        selected[None] = [getattr(model, column.key)
+                          for column in model.__table__.columns
+                          if base is None or column.key in base.model_fields]
+    for relation, target in relations.items():
+        if relation not in selected:
+            selected[relation] = [getattr(target, column.key)
+                                  for column in target.__table__.columns]
+    return selected
+
+
+# select do SQLAlchemy (e não o do SQLModel) para que mesmo uma única coluna
+# volte como linha, e não como escalar.
+def select_columns(selected: dict[str | None, list]) -> Select:
+    return select(*selected[None])
+
+
+def parse_include(include: str | None, allowed: tuple[str, ...],
+                  default: tuple[str, ...]) -> tuple[str, ...]:
+    if include is None:
+        return default
+    names = tuple(filter(None, (part.strip() for part in include.split(","))))
+    for name in names:
+        if name not in allowed:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                                detail=f"Unknown relation '{name}'.")
+    return names
+
+
+# `loaders` associa cada relação a (função de carga, limite por item). Os
+# itens e os filhos vêm como dicts, prontos para api/responses.py.
+async def load_rows(session: AsyncSession, statement,
+                    selected: dict[str | None, list],
+                    included: tuple[str, ...],
+                    loaders: dict[str, tuple]) -> list[dict]:
+    items = await fetch_rows(session, statement)
+    ids = [item["id"] for item in items]
+    for relation in included:
+        load, limit = loaders[relation]
+        children = await load(session, ids, limit, selected.get(relation))
+        for item in items:
+            item[relation] = children[item["id"]]
+    return items
@@ -0,0 +1,69 @@
+from collections import defaultdict
+
+from sqlalchemy import func
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from models.assignment import Assignment
+from models.collaborator import Collaborator
+from models.task import Task
+
+# Quantos filhos cada item de uma listagem paginada traz embutidos; o
+# restante fica nos endpoints paginados de filhos (ex.: /projects/{id}/tasks).
+EMBED_LIMIT = 20
+
+
+# Os filhos de todos os pais da página vêm numa única consulta com IN, em vez
+# de um JOIN que repete cada pai por filho. O row_number é calculado só sobre
+# o índice (pai, id); as linhas completas são lidas apenas para os primeiros
+# `limit` filhos de cada pai (None = todos). Com `columns`, cada filho vem
+# como dict só com essas colunas; sem, como objeto ORM.
+async def _load_children(session: AsyncSession, ids: list[int], parent_key,
+                         child_key, child, limit: int | None,
+                         columns: list | None = None) -> dict[int, list]:
+    children = defaultdict(list)
+    if not ids or limit == 0:
+        return children
+    ranked = (select(parent_key.label("parent_id"),
+                     child_key.label("child_id"),
+                     func.row_number().over(
+                         partition_by=parent_key,
+                         order_by=child_key).label("position"))
+              .where(parent_key.in_(ids))
+              .subquery())
+    statement = (select(ranked.c.parent_id, *(columns or [child]))
+                 .join(ranked, ranked.c.child_id == child.id)
+                 .order_by(ranked.c.parent_id, child.id))
+    if limit is not None:
+        statement = statement.where(ranked.c.position <= limit)
+    for parent_id, *values in (await session.exec(statement)).all():
+        if columns:
+            item = dict(zip((column.key for column in columns), values))
+        else:
+            item = values[0]
+        children[parent_id].append(item)
+    return children
+
+
+async def load_project_tasks(session: AsyncSession, ids: list[int],
+                             limit: int | None = EMBED_LIMIT,
+                             columns: list | None = None) -> dict[int, list]:
+    return await _load_children(session, ids, Task.project_id, Task.id,
+                                Task, limit, columns)
+
+
+async def load_task_collaborators(session: AsyncSession, ids: list[int],
+                                  limit: int | None = EMBED_LIMIT,
+                                  columns: list | None = None
+                                  ) -> dict[int, list]:
+    return await _load_children(session, ids, Assignment.task_id,
+                                Assignment.collaborator_id, Collaborator,
+                                limit, columns)
+
+
+async def load_collaborator_tasks(session: AsyncSession, ids: list[int],
+                                  limit: int | None = EMBED_LIMIT,
+                                  columns: list | None = None
+                                  ) -> dict[int, list]:
+    return await _load_children(session, ids, Assignment.collaborator_id,
+                                Assignment.task_id, Task, limit, columns)
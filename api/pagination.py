@@ -0,0 +1,44 @@
+import base64
+import binascii
+import json
+
+from fastapi import HTTPException, Response
+from sqlalchemy import Select
+from starlette import status
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+# O cursor é opaco para o cliente: o id da última linha da página,
+# serializado em JSON e codificado em base64 (url-safe).
+def encode_cursor(last_id: int) -> str:
+    payload = json.dumps({"id": last_id}).encode()
+    return base64.urlsafe_b64encode(payload).decode()
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        last_id = json.loads(base64.urlsafe_b64decode(cursor))["id"]
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        last_id = None
+    if not isinstance(last_id, int):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail="Invalid cursor.")
+    return last_id
+
+
+# Com cursor, a página começa depois do último id visto (keyset), com custo
+# independente da profundidade; sem ele, mantém-se o offset.
+def paginate(statement: Select, key_column, cursor: str | None,
+             offset: int, limit: int) -> Select:
+    statement = statement.order_by(key_column).limit(limit)
+    if cursor:
+        return statement.where(key_column > decode_cursor(cursor))
+    return statement.offset(offset)
+
+
+def set_next_cursor(response: Response, items: list, limit: int) -> None:
+    if items and len(items) == limit:
+        last = items[-1]
+        last_id = last["id"] if isinstance(last, dict) else last.id
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last_id)
@@ -0,0 +1,26 @@
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import Select, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette import status
+
+
+# Caminho rápido das leituras: as linhas saem do banco como dicts e são
+# codificadas direto pelo orjson (datetime e enums incluídos), sem passar
+# cada objeto ORM pelo response_model. O response_model continua declarado
+# nas rotas e segue descrevendo o formato no OpenAPI.
+def select_rows(model) -> Select:
+    # select do SQLAlchemy: colunas da tabela, e não a entidade ORM.
+    return select(*model.__table__.columns)
+
+
+async def fetch_rows(session: AsyncSession, statement) -> list[dict]:
+    return [row._asdict() for row in (await session.exec(statement)).all()]
+
+
+# Os cabeçalhos já definidos no `response` injetado (ex.: X-Next-Cursor)
+# são copiados para a resposta devolvida.
+def rows_response(content, response: Response | None = None,
+                  status_code: int = status.HTTP_200_OK) -> ORJSONResponse:
+    headers = dict(response.headers) if response is not None else None
+    return ORJSONResponse(content, status_code=status_code, headers=headers)
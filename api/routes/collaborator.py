@@ -1,61 +1,95 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
-from sqlmodel import Session, select
-from sqlalchemy.orm import joinedload
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from sqlalchemy import delete as sql_delete, insert, update as sql_update
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
 from starlette import status
 
 from database import get_session
-from models.collaborator import Collaborator
+from api.bulk import bulk_body, existing_values, failure, insert_valid
+from api.constraints import execute_write
+from api.fields import (load_rows, parse_fields, parse_include,
+                        select_columns)
+from api.loaders import EMBED_LIMIT, load_collaborator_tasks
+from api.pagination import paginate, set_next_cursor
+from api.responses import fetch_rows, rows_response, select_rows
+from models.collaborator import Collaborator, CollaboratorBase
+from dto.bulk_dto import AssignmentBulkItem, BulkResponse
 from dto.collaborator_dto import CollaboratorWithTasks
 from models.task import Task
 from models.assignment import Assignment
+from services.cache import cached, invalidate
+from services.changefeed import publish
+from services.profiler import query_budget
+from services.search import search
 
 router = APIRouter()
 
+EMAIL_EXISTS = {"collaborator.email": (status.HTTP_400_BAD_REQUEST,
+                                       "This email already exists.")}
+ALREADY_ASSIGNED = {
+    "assignment.task_id, assignment.collaborator_id": (
+        status.HTTP_400_BAD_REQUEST, "Collaborator is already assigned.")}
+
+
+# O detalhe do colaborador embute tarefas: a entrada em cache é invalidada
+# também por escritas nessas tarefas e nos seus projetos. Sem project_id
+# (seleção esparsa), cai na tag geral "tasks".
+def collaborator_tags(params: dict, content: dict) -> list[str]:
+    tags = [f"collaborator:{params['collaborator_id']}"]
+    for task in content.get("tasks", []):
+        tags.append(f"task:{task['id']}")
+        tags.append(f"project:{task['project_id']}" if "project_id" in task
+                    else "tasks")
+    return tags
+
 
 @router.post("/",
              response_model=Collaborator,
              status_code=status.HTTP_201_CREATED
              )
+@query_budget(1)
 async def create(collaborator: Collaborator,
-                 session: Session = Depends(get_session)) -> Collaborator:
-    statement = select(Collaborator).where(Collaborator.email ==
-                                           collaborator.email)
-    collaborator_exist = session.exec(statement).first()
-    if collaborator_exist:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
-                            detail="This email already exists.")
-    session.add(collaborator)
-    session.commit()
-    session.refresh(collaborator)
-    return collaborator
+                 session: AsyncSession = Depends(get_session)) -> Collaborator:
+    statement = (insert(Collaborator)
+                 .values(collaborator.model_dump(exclude={"id"}))
+                 .returning(*Collaborator.__table__.columns))
+    row = await execute_write(session, statement, EMAIL_EXISTS)
+    publish("collaborator", row["id"], "create")
+    return Collaborator(**row)
 
 
+# O INSERT basta no caminho feliz. Como o SQLite não diz qual chave
+# estrangeira falhou, só nesse caso uma consulta decide entre os 404. O
+# project_id da tarefa, para o feed de mudanças, vem no próprio RETURNING.
 @router.post("/assignments",
              response_model=dict,
              status_code=status.HTTP_201_CREATED
              )
+@query_budget(2)
 async def add_collaborator_in_task(assignment: Assignment,
-                                   session: Session = Depends(get_session)
+                                   session: AsyncSession = Depends(get_session)
                                    ) -> dict:
-    collaborator = session.get(Collaborator, assignment.collaborator_id)
-    if not collaborator:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
-                            detail="Collaborator not found.")
-    task = session.get(Task, assignment.task_id)
-    if not task:
+    statement = (insert(Assignment)
+                 .values(task_id=assignment.task_id,
+                         collaborator_id=assignment.collaborator_id)
+                 .returning(select(Task.project_id)
+                            .where(Task.id == Assignment.task_id)
+                            .scalar_subquery().label("project_id")))
+    try:
+        row = await execute_write(session, statement, ALREADY_ASSIGNED)
+    except IntegrityError:
+        if not await session.get(Collaborator, assignment.collaborator_id):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                                detail="Collaborator not found.")
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail="Task not found.")
-    statement = (select(Assignment)
-                 .where(Assignment.task_id == assignment.task_id,
-                        Assignment.collaborator_id ==
-                        assignment.collaborator_id))
-    exist_assignment = session.exec(statement).first()
-    if exist_assignment:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
-                            detail="Collaborator is already assigned.")
-    session.add(assignment)
-    session.commit()
-    session.refresh(assignment)
+    await invalidate(f"collaborator:{assignment.collaborator_id}",
+                     "assignments")
+    publish("assignment", assignment.task_id, "create",
+            project_id=row["project_id"],
+            collaborator_id=assignment.collaborator_id)
     return {
         "Message": "Collaborator added to task successfully.",
         "task_id": assignment.task_id,
@@ -63,17 +97,126 @@ async def add_collaborator_in_task(assignment: Assignment,
     }
 
 
+# Criar colaboradores em lote numa única instrução. E-mails repetidos no
+# próprio lote são recusados antes; os já cadastrados, inclusive por uma
+# escrita concorrente, são pulados pelo ON CONFLICT DO NOTHING e recusados
+# item a item.
+@router.post("/bulk",
+             response_model=BulkResponse,
+             status_code=status.HTTP_200_OK
+             )
+@query_budget(1)
+async def create_bulk(collaborators: list[CollaboratorBase] = bulk_body(),
+                      session: AsyncSession = Depends(get_session)
+                      ) -> BulkResponse:
+    emails, rows, failures = set(), [], []
+    for index, collaborator in enumerate(collaborators):
+        if collaborator.email in emails:
+            failures.append(failure(index, status.HTTP_400_BAD_REQUEST,
+                                    "This email already exists."))
+        else:
+            emails.add(collaborator.email)
+            rows.append((index, collaborator.model_dump(exclude={"id"})))
+    statement = sqlite_insert(Collaborator.__table__).on_conflict_do_nothing()
+    result = await insert_valid(
+        session, statement, rows, failures,
+        conflict=(("email",), *EMAIL_EXISTS["collaborator.email"]))
+    for item in result.items:
+        if item.status_code == status.HTTP_201_CREATED:
+            publish("collaborator", item.id, "create")
+    return result
+
+
+# Atribuir colaboradores a tarefas em lote: tarefas e colaboradores são
+# verificados com uma consulta cada; a das tarefas traz também o projeto de
+# cada uma, para o feed de mudanças. Atribuições já existentes, inclusive
+# as gravadas por uma escrita concorrente, são puladas pelo ON CONFLICT DO
+# NOTHING e recusadas item a item. Uma tarefa ou um colaborador removido
+# antes do INSERT faz a chave estrangeira falhar: a verificação é refeita e
+# o INSERT repetido sem esses itens (mais três consultas).
+@router.post("/assignments/bulk",
+             response_model=BulkResponse,
+             status_code=status.HTTP_200_OK
+             )
+@query_budget(6)
+async def add_collaborators_in_tasks_bulk(
+    assignments: list[AssignmentBulkItem] = bulk_body(),
+    session: AsyncSession = Depends(get_session)
+) -> BulkResponse:
+    tasks = {}
+
+    async def check_references(rows: list) -> tuple[list, list]:
+        statement = (select(Task.id, Task.project_id)
+                     .where(Task.id.in_({row["task_id"] for _, row in rows})))
+        tasks.clear()
+        tasks.update((await session.exec(statement)).all())
+        collaborators = await existing_values(
+            session, Collaborator.id,
+            [row["collaborator_id"] for _, row in rows])
+        valid, failures = [], []
+        for index, row in rows:
+            if row["collaborator_id"] not in collaborators:
+                failures.append(failure(index, status.HTTP_404_NOT_FOUND,
+                                        "Collaborator not found."))
+            elif row["task_id"] not in tasks:
+                failures.append(failure(index, status.HTTP_404_NOT_FOUND,
+                                        "Task not found."))
+            else:
+                valid.append((index, row))
+        return valid, failures
+
+    pairs, rows, failures = set(), [], []
+    for index, item in enumerate(assignments):
+        pair = (item.task_id, item.collaborator_id)
+        if pair in pairs:
+            failures.append(failure(index, status.HTTP_400_BAD_REQUEST,
+                                    "Collaborator is already assigned."))
+        else:
+            pairs.add(pair)
+            rows.append((index, item.model_dump()))
+    rows, stale = await check_references(rows)
+    statement = sqlite_insert(Assignment.__table__).on_conflict_do_nothing()
+    result = await insert_valid(
+        session, statement, rows, failures + stale, returning=False,
+        conflict=(("task_id", "collaborator_id"),
+                  *ALREADY_ASSIGNED["assignment.task_id, "
+                                    "assignment.collaborator_id"]),
+        revalidate=check_references)
+    rows = dict(rows)
+    created = [rows[item.index] for item in result.items
+               if item.status_code == status.HTTP_201_CREATED]
+    if created:
+        await invalidate(*{f"collaborator:{row['collaborator_id']}"
+                           for row in created}, "assignments")
+        for row in created:
+            publish("assignment", row["task_id"], "create",
+                    project_id=tasks[row["task_id"]],
+                    collaborator_id=row["collaborator_id"])
+    return result
+
+
 @router.get("/",
             response_model=list[Collaborator],
             status_code=status.HTTP_200_OK
             )
-async def find_all(offset: int = Query(default=0, ge=0),
+@query_budget(2)
+async def find_all(response: Response,
+                   offset: int = Query(default=0, ge=0),
                    limit: int = Query(default=10, le=100),
-                   session: Session = Depends(get_session)
+                   cursor: str | None = None,
+                   fields: str | None = None,
+                   include: str | None = None,
+                   session: AsyncSession = Depends(get_session)
                    ) -> list[Collaborator]:
-    statement = select(Collaborator).offset(offset).limit(limit)
-    collaborators = session.exec(statement).all()
-    return collaborators
+    selected = parse_fields(fields, Collaborator, {"tasks": Task})
+    included = parse_include(include, ("tasks",), ())
+    statement = paginate(select_columns(selected), Collaborator.id, cursor,
+                         offset, limit)
+    collaborators = await load_rows(
+        session, statement, selected, included,
+        {"tasks": (load_collaborator_tasks, EMBED_LIMIT)})
+    set_next_cursor(response, collaborators, limit)
+    return rows_response(collaborators, response)
 
 
 # Find tasks title by collaborator email
@@ -81,22 +224,48 @@ async def find_all(offset: int = Query(default=0, ge=0),
             response_model=list[CollaboratorWithTasks],
             status_code=status.HTTP_200_OK
             )
+@query_budget(2)
 async def find_tasks_by_colaborator_email(
     email: str,
+    response: Response,
     offset: int = Query(default=0, ge=0),
     limit: int = Query(default=10, le=100),
-    session: Session = Depends(get_session)
+    cursor: str | None = None,
+    tasks_limit: int = Query(default=EMBED_LIMIT, ge=0, le=100),
+    fields: str | None = None,
+    include: str | None = None,
+    session: AsyncSession = Depends(get_session)
 ) -> list[CollaboratorWithTasks]:
-    statement = (select(Collaborator)
-                 .where(Collaborator.email.ilike(f"%{email}%"))
-                 .options(joinedload(Collaborator.tasks))
-                 .offset(offset)
-                 .limit(limit))
-    result = session.exec(statement).unique().all()
+    selected = parse_fields(fields, Collaborator, {"tasks": Task})
+    included = parse_include(include, ("tasks",), ("tasks",))
+    statement = paginate(
+        search(select_columns(selected), Collaborator, email,
+               columns=("email",), ranked=False),
+        Collaborator.id, cursor, offset, limit
+        )
+    result = await load_rows(
+        session, statement, selected, included,
+        {"tasks": (load_collaborator_tasks, tasks_limit)})
     if not result:
         raise HTTPException(status_code=404,
                             detail="No collaborator found.")
-    return result
+    set_next_cursor(response, result, limit)
+    return rows_response(result, response)
+
+
+# Buscar colaboradores por nome e e-mail, ordenados por relevância.
+@router.get("/search",
+            response_model=list[Collaborator],
+            status_code=status.HTTP_200_OK
+            )
+@query_budget(1)
+async def search_collaborators(q: str,
+                               limit: int = Query(default=10, le=100),
+                               session: AsyncSession = Depends(get_session)
+                               ) -> list[Collaborator]:
+    statement = search(select_rows(Collaborator), Collaborator,
+                       q).limit(limit)
+    return rows_response(await fetch_rows(session, statement))
 
 
 # Listar todas as tarefas do colaborador
@@ -105,48 +274,95 @@ async def find_tasks_by_colaborator_email(
             response_model=CollaboratorWithTasks,
             status_code=status.HTTP_200_OK
             )
+@query_budget(2)
+@cached(CollaboratorWithTasks, tags=collaborator_tags)
 async def find_by_id(collaborator_id: int,
-                     session: Session = Depends(get_session)
+                     response: Response,
+                     fields: str | None = None,
+                     include: str | None = None,
+                     session: AsyncSession = Depends(get_session)
                      ) -> CollaboratorWithTasks:
-    statement = (select(Collaborator).where(Collaborator.id == collaborator_id)
-                 .options(joinedload(Collaborator.tasks)))
-    collaborator = session.exec(statement).first()
+    # Relação muitos-para-muitos: com um JOIN o SQLite materializava
+    # assignment-task varrendo task inteira; as tarefas vêm numa segunda
+    # consulta por IN, pelos índices.
+    selected = parse_fields(fields, Collaborator, {"tasks": Task})
+    included = parse_include(include, ("tasks",), ("tasks",))
+    statement = (select_columns(selected)
+                 .where(Collaborator.id == collaborator_id))
+    collaborators = await load_rows(
+        session, statement, selected, included,
+        {"tasks": (load_collaborator_tasks, None)})
+    if not collaborators:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail="Collaborator not found.")
+    return rows_response(collaborators[0], response)
+
+
+# Listar, paginadas, as tarefas de um colaborador.
+@router.get("/{collaborator_id}/tasks",
+            response_model=list[Task],
+            status_code=status.HTTP_200_OK
+            )
+@query_budget(2)
+async def find_collaborator_tasks(collaborator_id: int,
+                                  response: Response,
+                                  offset: int = Query(default=0, ge=0),
+                                  limit: int = Query(default=10, le=100),
+                                  cursor: str | None = None,
+                                  session: AsyncSession = Depends(get_session)
+                                  ) -> list[Task]:
+    collaborator = await session.get(Collaborator, collaborator_id)
     if not collaborator:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail="Collaborator not found.")
-    return collaborator
+    statement = paginate(select_rows(Task)
+                         .join(Assignment, Assignment.task_id == Task.id)
+                         .where(Assignment.collaborator_id ==
+                                collaborator_id),
+                         Task.id, cursor, offset, limit)
+    tasks = await fetch_rows(session, statement)
+    set_next_cursor(response, tasks, limit)
+    return rows_response(tasks, response)
 
 
 @router.put("/{collaborator_id}",
             response_model=Collaborator,
             status_code=status.HTTP_200_OK
             )
+@query_budget(1)
 async def update(collaborator_id: int,
                  up_collaborator: Collaborator,
-                 session: Session = Depends(get_session)
+                 session: AsyncSession = Depends(get_session)
                  ) -> Collaborator:
-    collaborator = session.get(Collaborator, collaborator_id)
-    if not collaborator:
+    changes = up_collaborator.model_dump(exclude_unset=True, exclude={"id"})
+    # Sem campos no corpo, o SET id = id mantém o UPDATE ... RETURNING
+    # como leitura e a resposta 404.
+    statement = (sql_update(Collaborator)
+                 .where(Collaborator.id == collaborator_id)
+                 .values(changes or {"id": Collaborator.id})
+                 .returning(*Collaborator.__table__.columns))
+    row = await execute_write(session, statement, EMAIL_EXISTS)
+    if row is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail="Collaborator not found.")
-    for key, value in up_collaborator.model_dump(exclude_unset=True).items():
-        setattr(collaborator, key, value)
-
-    session.add(collaborator)
-    session.commit()
-    session.refresh(collaborator)
-    return collaborator
+    await invalidate(f"collaborator:{collaborator_id}")
+    publish("collaborator", collaborator_id, "update")
+    return Collaborator(**row)
 
 
 @router.delete("/{collaborator_id}",
                status_code=status.HTTP_204_NO_CONTENT
                )
+@query_budget(1)
 async def delete(collaborator_id: int,
-                 session: Session = Depends(get_session)
+                 session: AsyncSession = Depends(get_session)
                  ):
-    collaborator = session.get(Collaborator, collaborator_id)
-    if not collaborator:
+    # As atribuições saem pelo ON DELETE CASCADE.
+    result = await session.exec(
+        sql_delete(Collaborator).where(Collaborator.id == collaborator_id))
+    if not result.rowcount:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail="Collaborator not found")
-    session.delete(collaborator)
-    session.commit()
+    await session.commit()
+    await invalidate(f"collaborator:{collaborator_id}", "assignments")
+    publish("collaborator", collaborator_id, "delete")
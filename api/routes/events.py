@@ -0,0 +1,41 @@
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from starlette import status
+
+from services.changefeed import CHANGEFEED_HEARTBEAT, ENTITIES, feed
+from services.profiler import query_budget
+
+router = APIRouter()
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def parse_entities(entity: str | None) -> tuple[str, ...] | None:
+    if entity is None:
+        return None
+    names = tuple(filter(None, (part.strip() for part in entity.split(","))))
+    for name in names:
+        if name not in ENTITIES:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                                detail=f"Unknown entity '{name}'.")
+    return names
+
+
+# Feed de mudanças em Server-Sent Events. Cada evento traz entidade, id,
+# operação, status novo e project_id (quando há); `project_id` e
+# `entity=task,project` filtram o feed. Na reconexão, o EventSource envia o
+# cabeçalho Last-Event-ID e o feed continua de onde parou; `last_event_id`
+# faz o mesmo na primeira conexão. Um evento `reset` pede ao cliente que
+# recarregue os dados, pois parte das mudanças já não está no buffer.
+@router.get("/")
+@query_budget(0)
+async def stream_changes(request: Request,
+                         project_id: int | None = None,
+                         entity: str | None = None,
+                         last_event_id: str | None = None
+                         ) -> StreamingResponse:
+    subscription = feed.subscribe(parse_entities(entity), project_id)
+    last_event_id = request.headers.get("last-event-id", last_event_id)
+    return StreamingResponse(
+        feed.stream(subscription, last_event_id, CHANGEFEED_HEARTBEAT),
+        media_type="text/event-stream", headers=SSE_HEADERS)
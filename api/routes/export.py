@@ -0,0 +1,131 @@
+import csv
+import io
+import json
+from datetime import date, datetime, time, timedelta
+from enum import Enum
+from typing import Literal
+
+from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select, select
+
+from database import session_scope
+from models.assignment import Assignment
+from models.enum.status_enum import StatusEnum
+from models.project import Project
+from models.task import Task
+from services.profiler import query_budget
+
+router = APIRouter()
+
+# Linhas lidas do cursor por vez; a memória usada não depende do total.
+EXPORT_CHUNK = 1000
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+ExportFormat = Literal["ndjson", "csv"]
+
+
+def _plain(value):
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _ndjson(columns: list[str], rows) -> str:
+    return "".join(json.dumps(dict(zip(columns, map(_plain, row)))) + "\n"
+                   for row in rows)
+
+
+def _csv(rows) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([_plain(value) for value in row]
+                                 for row in rows)
+    return buffer.getvalue()
+
+
+async def _stream_rows(statement: Select, format: ExportFormat):
+    async with session_scope() as session:
+        result = await session.stream(
+            statement.execution_options(yield_per=EXPORT_CHUNK))
+        columns = list(result.keys())
+        if format == "csv":
+            yield _csv([columns])
+        async for rows in result.partitions():
+            if format == "csv":
+                yield _csv(rows)
+            else:
+                yield _ndjson(columns, rows)
+
+
+# As linhas saem direto do cursor do SQLite, em ordem de id, sem passar por
+# objetos ORM nem pelos DTOs.
+def export_response(statement: Select, format: ExportFormat,
+                    name: str) -> StreamingResponse:
+    return StreamingResponse(
+        _stream_rows(statement, format),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition":
+                 f'attachment; filename="{name}.{format}"'})
+
+
+# Intervalo semiaberto sobre created_at, com as datas inclusivas.
+def created_between(statement: Select, column, start_date: date | None,
+                    end_date: date | None) -> Select:
+    if start_date:
+        statement = statement.where(
+            column >= datetime.combine(start_date, time.min))
+    if end_date:
+        statement = statement.where(
+            column < datetime.combine(end_date + timedelta(days=1),
+                                      time.min))
+    return statement
+
+
+@router.get("/projects")
+@query_budget(1)
+async def export_projects(format: ExportFormat = "ndjson",
+                          status: StatusEnum | None = None,
+                          start_date: date | None = None,
+                          end_date: date | None = None
+                          ) -> StreamingResponse:
+    statement = select(*Project.__table__.columns).order_by(Project.id)
+    if status:
+        statement = statement.where(Project.status == status)
+    statement = created_between(statement, Project.created_at, start_date,
+                                end_date)
+    return export_response(statement, format, "projects")
+
+
+@router.get("/tasks")
+@query_budget(1)
+async def export_tasks(format: ExportFormat = "ndjson",
+                       project_id: int | None = None,
+                       status: StatusEnum | None = None,
+                       start_date: date | None = None,
+                       end_date: date | None = None
+                       ) -> StreamingResponse:
+    statement = select(*Task.__table__.columns).order_by(Task.id)
+    if project_id is not None:
+        statement = statement.where(Task.project_id == project_id)
+    if status:
+        statement = statement.where(Task.status == status)
+    statement = created_between(statement, Task.created_at, start_date,
+                                end_date)
+    return export_response(statement, format, "tasks")
+
+
+@router.get("/assignments")
+@query_budget(1)
+async def export_assignments(format: ExportFormat = "ndjson",
+                             project_id: int | None = None
+                             ) -> StreamingResponse:
+    statement = (select(Assignment.task_id, Assignment.collaborator_id)
+                 .order_by(Assignment.task_id, Assignment.collaborator_id))
+    if project_id is not None:
+        statement = (statement
+                     .join(Task, Task.id == Assignment.task_id)
+                     .where(Task.project_id == project_id))
+    return export_response(statement, format, "assignments")
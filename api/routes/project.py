@@ -1,28 +1,107 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
-from sqlmodel import Session, select
-from sqlalchemy.sql import func
-from sqlalchemy.orm import joinedload
+from fastapi import (APIRouter, HTTPException, Depends, Query, Path,
+                     Request, Response)
+from sqlalchemy import delete, insert, update
+from sqlmodel import func, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from starlette import status
-from datetime import datetime, timezone
+from datetime import date, datetime, time, timedelta, timezone
 
 from database import get_session
+from api.conditional import conditional
+from api.constraints import execute_write
+from api.fields import (load_rows, parse_fields, parse_include,
+                        select_columns)
+from api.loaders import EMBED_LIMIT, load_project_tasks
+from api.pagination import paginate, set_next_cursor
+from api.responses import fetch_rows, rows_response, select_rows
 from models.project import Project
+from models.task import Task
+from models.statistic import ProjectStatistic, ProjectStatusStatistic
 from dto.project_dto import ProjecBaseWithTask
+from services.cache import cached, invalidate
+from services.changefeed import publish
+from services.profiler import query_budget
+from services.search import search
 
 router = APIRouter()
 
 
+# Validadores dos GETs condicionais (api/conditional.py). A ETag vem das
+# versões de projectstatistic, incrementadas por trigger a cada escrita no
+# projeto ou em suas tarefas, e projectstatusstatistic, a cada projeto
+# criado, removido ou com status alterado; changed_at serve só ao
+# Last-Modified. Para páginas, entram também a quantidade e a soma dos ids.
+async def project_validator(project_id: int, session: AsyncSession,
+                            **_):
+    statement = (select(ProjectStatistic.version,
+                        ProjectStatistic.changed_at)
+                 .where(ProjectStatistic.project_id == project_id))
+    row = (await session.exec(statement)).first()
+    if row is None:
+        return None
+    return (row.version,), row.changed_at
+
+
+async def projects_page_validator(cursor: str | None, offset: int,
+                                  limit: int, session: AsyncSession, **_):
+    page = paginate(select(Project.id), Project.id, cursor, offset,
+                    limit).subquery()
+    projects_version = (select(func.sum(ProjectStatusStatistic.version))
+                        .scalar_subquery())
+    projects_changed_at = (select(func.max(ProjectStatusStatistic.changed_at))
+                           .scalar_subquery())
+    statement = (select(func.count(), func.sum(page.c.id),
+                        func.sum(ProjectStatistic.version),
+                        func.max(ProjectStatistic.changed_at),
+                        projects_version, projects_changed_at)
+                 .select_from(page)
+                 .join(ProjectStatistic,
+                       ProjectStatistic.project_id == page.c.id))
+    (count, ids, versions, changed_at, projects_version,
+     projects_changed_at) = (await session.exec(statement)).one()
+    # Remoções e inserções de projetos mudam a composição das páginas sem
+    # tocar nos projetos que continuam nelas.
+    last_modified = max(filter(None, (changed_at, projects_changed_at)),
+                        default=None)
+    return (count, ids, versions, projects_version), last_modified
+
+
+async def project_tasks_validator(project_id: int, cursor: str | None,
+                                  offset: int, limit: int,
+                                  session: AsyncSession, **_):
+    page = paginate(select(Task.id).where(Task.project_id == project_id),
+                    Task.id, cursor, offset, limit).subquery()
+    project_version = (select(ProjectStatistic.version)
+                       .where(ProjectStatistic.project_id == project_id)
+                       .scalar_subquery())
+    project_changed_at = (select(ProjectStatistic.changed_at)
+                          .where(ProjectStatistic.project_id == project_id)
+                          .scalar_subquery())
+    statement = select(func.count(), func.sum(page.c.id), project_version,
+                       project_changed_at)
+    count, ids, version, changed_at = (await session.exec(statement)).one()
+    if version is None:
+        return None
+    return (count, ids, version), changed_at
+
+
 # Project
 @router.post("/",
              response_model=Project,
              status_code=status.HTTP_201_CREATED
              )
+@query_budget(1)
 async def create_project(project: Project,
-                         session: Session = Depends(get_session)) -> Project:
-    session.add(project)
-    session.commit()
-    session.refresh(project)
-    return project
+                         session: AsyncSession = Depends(get_session)
+                         ) -> Project:
+    statement = (insert(Project)
+                 .values(project.model_dump(exclude={"id"}))
+                 .returning(*Project.__table__.columns))
+    row = await execute_write(session, statement)
+    await invalidate("projects")
+    publish("project", row["id"], "create", row["status"],
+            project_id=row["id"])
+    return Project(**row)
 
 
 # Listar todos os projetos
@@ -30,18 +109,42 @@ async def create_project(project: Project,
             response_model=list[ProjecBaseWithTask],
             status_code=status.HTTP_200_OK
             )
-async def find_all_project(offset: int = Query(default=0, ge=0),
+@query_budget(3)
+@conditional(projects_page_validator)
+async def find_all_project(request: Request,
+                           response: Response,
+                           offset: int = Query(default=0, ge=0),
                            limit: int = Query(default=10, le=100),
-                           session: Session = Depends(get_session)
+                           cursor: str | None = None,
+                           tasks_limit: int = Query(default=EMBED_LIMIT,
+                                                    ge=0, le=100),
+                           fields: str | None = None,
+                           include: str | None = None,
+                           session: AsyncSession = Depends(get_session)
                            ) -> list[ProjecBaseWithTask]:
-    statement = (
-        select(Project)
-        .offset(offset)
-        .limit(limit)
-        .options(joinedload(Project.tasks))
-        )
-    projects = session.exec(statement).unique().all()
-    return projects
+    selected = parse_fields(fields, Project, {"tasks": Task})
+    included = parse_include(include, ("tasks",), ("tasks",))
+    statement = paginate(select_columns(selected), Project.id, cursor,
+                         offset, limit)
+    projects = await load_rows(session, statement, selected, included,
+                               {"tasks": (load_project_tasks, tasks_limit)})
+    set_next_cursor(response, projects, limit)
+    return rows_response(projects, response)
+
+
+# Buscar projetos por nome e descrição, ordenados por relevância.
+# Declarada antes de /{project_id} para não ser capturada por ela.
+@router.get("/search",
+            response_model=list[Project],
+            status_code=status.HTTP_200_OK
+            )
+@query_budget(1)
+async def search_projects(q: str,
+                          limit: int = Query(default=10, le=100),
+                          session: AsyncSession = Depends(get_session)
+                          ) -> list[Project]:
+    statement = search(select_rows(Project), Project, q).limit(limit)
+    return rows_response(await fetch_rows(session, statement))
 
 
 # Mostrar um projeto por id
@@ -49,16 +152,53 @@ async def find_all_project(offset: int = Query(default=0, ge=0),
             response_model=ProjecBaseWithTask,
             status_code=status.HTTP_200_OK
             )
+@query_budget(3)
+@conditional(project_validator)
+@cached(ProjecBaseWithTask,
+        tags=lambda params, content: [f"project:{params['project_id']}"])
 async def find_project_by_id(project_id: int,
-                             session: Session = Depends(get_session)
+                             request: Request,
+                             response: Response,
+                             fields: str | None = None,
+                             include: str | None = None,
+                             session: AsyncSession = Depends(get_session)
                              ) -> ProjecBaseWithTask:
-    statement = (select(Project).where(Project.id == project_id)
-                 .options(joinedload(Project.tasks)))
-    project = session.exec(statement).first()
+    selected = parse_fields(fields, Project, {"tasks": Task})
+    included = parse_include(include, ("tasks",), ("tasks",))
+    statement = select_columns(selected).where(Project.id == project_id)
+    projects = await load_rows(session, statement, selected, included,
+                               {"tasks": (load_project_tasks, None)})
+    if not projects:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail="Project not found.")
+    return rows_response(projects[0], response)
+
+
+# Listar, paginadas, as tarefas de um projeto.
+@router.get("/{project_id}/tasks",
+            response_model=list[Task],
+            status_code=status.HTTP_200_OK
+            )
+@query_budget(3)
+@conditional(project_tasks_validator)
+async def find_project_tasks(project_id: int,
+                             request: Request,
+                             response: Response,
+                             offset: int = Query(default=0, ge=0),
+                             limit: int = Query(default=10, le=100),
+                             cursor: str | None = None,
+                             session: AsyncSession = Depends(get_session)
+                             ) -> list[Task]:
+    project = await session.get(Project, project_id)
     if not project:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail="Project not found.")
-    return project
+    statement = paginate(select_rows(Task)
+                         .where(Task.project_id == project_id),
+                         Task.id, cursor, offset, limit)
+    tasks = await fetch_rows(session, statement)
+    set_next_cursor(response, tasks, limit)
+    return rows_response(tasks, response)
 
 
 # Listar os títulos de projetos cujo título contém determinada string.
@@ -66,13 +206,13 @@ async def find_project_by_id(project_id: int,
             response_model=list[str],
             status_code=status.HTTP_200_OK
             )
+@query_budget(1)
 async def search_project_titles(name: str,
-                                session: Session = Depends(get_session)
+                                session: AsyncSession = Depends(get_session)
                                 ) -> list[str]:
-    statement = select(Project.name).where(
-        Project.name.ilike(f"%{name}%")
-    )
-    titles = session.exec(statement).all()
+    statement = search(select(Project.name), Project, name,
+                       columns=("name",))
+    titles = (await session.exec(statement)).all()
     if not titles:
         raise HTTPException(status_code=404,
                             detail=f"No projects found for year {name}.")
@@ -80,16 +220,34 @@ async def search_project_titles(name: str,
 
 
 # Listar os títulos de projetos lançados em determinado ano.
+# O filtro é um intervalo semiaberto sobre created_at, para usar o índice
+# da coluna; mês e datas opcionais apenas estreitam o intervalo.
 @router.get("/titles/{year}",
             response_model=list[str],
             status_code=status.HTTP_200_OK
             )
-async def project_title_by_year(year: int,
-                                session: Session = Depends(get_session)
+@query_budget(1)
+async def project_title_by_year(year: int = Path(ge=1, le=9998),
+                                month: int | None = Query(default=None,
+                                                          ge=1, le=12),
+                                start_date: date | None = None,
+                                end_date: date | None = None,
+                                session: AsyncSession = Depends(get_session)
                                 ) -> list[str]:
-    statement = select(Project.name).where(
-        func.strftime('%Y', Project.created_at) == str(year))
-    titles = session.exec(statement).all()
+    if month:
+        start = datetime(year, month, 1)
+        end = datetime(year + month // 12, month % 12 + 1, 1)
+    else:
+        start = datetime(year, 1, 1)
+        end = datetime(year + 1, 1, 1)
+    if start_date:
+        start = max(start, datetime.combine(start_date, time.min))
+    if end_date:
+        end = min(end, datetime.combine(end_date + timedelta(days=1),
+                                        time.min))
+    statement = select(Project.name).where(Project.created_at >= start,
+                                           Project.created_at < end)
+    titles = (await session.exec(statement)).all()
     if not titles:
         raise HTTPException(status_code=404,
                             detail=f"No projects found for year {year}.")
@@ -100,29 +258,42 @@ async def project_title_by_year(year: int,
             response_model=Project,
             status_code=status.HTTP_200_OK
             )
+@query_budget(1)
 async def update_project(project_id: int, update_project: Project,
-                         session: Session = Depends(get_session)) -> Project:
-    project = session.get(Project, project_id)
-    if not project:
+                         session: AsyncSession = Depends(get_session)
+                         ) -> Project:
+    statement = (update(Project)
+                 .where(Project.id == project_id)
+                 .values({**update_project.model_dump(exclude_unset=True,
+                                                      exclude={"id"}),
+                          "updated_at": datetime.now(timezone.utc)})
+                 .returning(*Project.__table__.columns))
+    row = await execute_write(session, statement)
+    if row is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail="Project not found.")
-    for key, value in update_project.model_dump(exclude_unset=True).items():
-        setattr(project, key, value)
-    project.updated_at = datetime.now(timezone.utc)
-    session.add(project)
-    session.commit()
-    session.refresh(project)
-    return project
+    await invalidate(f"project:{project_id}", "projects")
+    publish("project", project_id, "update", row["status"],
+            project_id=project_id)
+    return Project(**row)
 
 
+# Uma instrução só: tarefas e atribuições saem pelo ON DELETE CASCADE das
+# chaves estrangeiras, sem serem carregadas na sessão.
 @router.delete("/{project_id}",
                status_code=status.HTTP_204_NO_CONTENT
                )
+@query_budget(1)
 async def delete_project(project_id: int,
-                         session: Session = Depends(get_session)) -> None:
-    project = session.get(Project, project_id)
-    if not project:
+                         session: AsyncSession = Depends(get_session)) -> None:
+    result = await session.exec(delete(Project)
+                                .where(Project.id == project_id))
+    if not result.rowcount:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail="Project not found.")
-    session.delete(project)
-    session.commit()
+    await session.commit()
+    await invalidate(f"project:{project_id}", "projects", "tasks",
+                     "assignments")
+    # Um evento só: as tarefas removidas em cascata não geram eventos
+    # próprios, e quem acompanha o projeto recebe a remoção dele.
+    publish("project", project_id, "delete", project_id=project_id)
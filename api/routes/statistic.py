@@ -1,5 +1,6 @@
 from fastapi import APIRouter, HTTPException, Depends
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlalchemy.sql import func
 from sqlalchemy import desc
 from starlette import status
@@ -7,11 +8,20 @@ from starlette import status
 from database import get_session
 from models.project import Project
 from models.task import Task
-from models.assignment import Assignment
+from models.enum.status_enum import StatusEnum
+from models.statistic import (ProjectStatistic, ProjectStatusStatistic,
+                              TaskStatistic)
 from dto.statistic_dto import ItemCount, GeneralResponse
+from services.cache import cache, cached
+from services.changefeed import feed
+from services.profiler import query_budget
 
 router = APIRouter()
 
+# As rotas leem os contadores de models/statistic.py, mantidos por triggers
+# a cada escrita; nenhuma delas agrega as tabelas base. Divergências são
+# corrigidas com `python -m scripts.rebuild_statistics`.
+
 
 # Project
 # Mostrar a quantidade total de projetos cadastrados.
@@ -19,10 +29,13 @@ router = APIRouter()
             response_model=ItemCount,
             status_code=status.HTTP_200_OK
             )
-async def total_registered_projects(session: Session = Depends(get_session)
+@query_budget(1)
+@cached(ItemCount, tags=lambda params, content: ["projects"])
+async def total_registered_projects(session: AsyncSession = Depends(
+                                        get_session)
                                     ) -> ItemCount:
-    statement = (select(func.count(Project.id)))
-    total = session.exec(statement).first()
+    statement = select(func.sum(ProjectStatusStatistic.total))
+    total = (await session.exec(statement)).first() or 0
     return ItemCount(
         name="Total number of registered projects.",
         count=total
@@ -35,19 +48,22 @@ async def total_registered_projects(session: Session = Depends(get_session)
             response_model=GeneralResponse,
             status_code=status.HTTP_200_OK
             )
+@query_budget(1)
+@cached(GeneralResponse,
+        tags=lambda params, content: ["projects", "tasks"])
 async def total_task_by_project(min_tasks: int = 0,
                                 max_tasks: int | None = None,
-                                session: Session = Depends(get_session)
+                                session: AsyncSession = Depends(get_session)
                                 ) -> GeneralResponse:
-    count_tasks = func.count(Task.id).label("task_count")
+    count_tasks = ProjectStatistic.task_count
     statement = (select(Project.name, count_tasks)
-                 .join(Task, isouter=True)
-                 .group_by(Project.id)
-                 .having(count_tasks >= min_tasks)
+                 .join(ProjectStatistic,
+                       ProjectStatistic.project_id == Project.id)
+                 .where(count_tasks >= min_tasks)
                  .order_by(desc(count_tasks)))
     if max_tasks:
-        statement = statement.having(count_tasks <= max_tasks)
-    result = session.exec(statement).all()
+        statement = statement.where(count_tasks <= max_tasks)
+    result = (await session.exec(statement)).all()
     items = [
         ItemCount(name=project_name, count=task_count) for project_name,
         task_count in result
@@ -63,29 +79,30 @@ async def total_task_by_project(min_tasks: int = 0,
             response_model=GeneralResponse,
             status_code=status.HTTP_200_OK
             )
+@query_budget(1)
+@cached(GeneralResponse, tags=lambda params, content: ["projects"])
 async def total_projects_by_status(status_project: str = None,
-                                   session: Session = Depends(get_session)
+                                   session: AsyncSession = Depends(get_session)
                                    ) -> GeneralResponse:
-    count_id = func.count(Project.id)
+    count_id = ProjectStatusStatistic.total
     if status_project:
         statement = (
             select(count_id)
-            .where(Project.status == status_project)
-            .order_by(desc(count_id))
+            .where(ProjectStatusStatistic.status == status_project)
             )
-        result = session.exec(statement).first()
+        result = (await session.exec(statement)).first() or 0
         return GeneralResponse(
             description=f"Total projects with status '{status_project}'.",
             details={f"Total {status_project}": result}
         )
     else:
         statement = (
-            select(Project.status, count_id.label(
+            select(ProjectStatusStatistic.status, count_id.label(
                 "status_count"))
-            .group_by(Project.status)
+            .where(count_id > 0)
             .order_by(count_id)
             )
-        result = session.exec(statement).all()
+        result = (await session.exec(statement)).all()
         details = [
             ItemCount(name=row.status, count=row.status_count)
             for row in result
@@ -102,25 +119,28 @@ async def total_projects_by_status(status_project: str = None,
             response_model=GeneralResponse,
             status_code=status.HTTP_200_OK
             )
+@query_budget(1)
+@cached(GeneralResponse,
+        tags=lambda params, content: [
+            f"project:{params['project_id']}"])
 async def total_tasks_by_status_and_project_id(project_id: int,
-                                               session: Session = Depends(
+                                               session: AsyncSession = Depends(
                                                    get_session)
                                                ) -> GeneralResponse:
-    project = session.get(Project, project_id)
-    if not project:
+    # A linha de contadores existe para todo projeto: serve também de
+    # verificação de existência.
+    statistic = await session.get(ProjectStatistic, project_id)
+    if not statistic:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail="Project not found.")
-    count_id = func.count(Task.id)
-    statement = (
-        select(Task.status, count_id.label("task_count"))
-        .where(Task.project_id == project_id)
-        .group_by(Task.status)
-        .order_by(desc(count_id))
-    )
-    result = session.exec(statement).all()
+    result = [
+        (status_proj, getattr(statistic, f"{status_proj.name.lower()}_count"))
+        for status_proj in StatusEnum
+        ]
     details = [
         ItemCount(name=status_proj, count=task_count)
-        for status_proj, task_count in result
+        for status_proj, task_count in sorted(result, key=lambda row: -row[1])
+        if task_count
         ]
     return GeneralResponse(
         description="Total tasks by status for project.",
@@ -134,27 +154,31 @@ async def total_tasks_by_status_and_project_id(project_id: int,
             response_model=GeneralResponse,
             status_code=status.HTTP_200_OK
             )
+@query_budget(1)
+@cached(GeneralResponse,
+        tags=lambda params, content: [
+            f"project:{params['project_id']}", "assignments"])
 async def total_collaborators_by_task_and_project(
     project_id: int,
     min_collaborators: int = 0,
     max_collaborators: int = None,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_session)
 ) -> GeneralResponse:
-    count_collaborators = func.count(Assignment.collaborator_id).label(
-        "collaborator_count")
+    # Tarefas sem colaboradores ficam de fora, como no antigo INNER JOIN
+    # com assignment.
+    count_collaborators = TaskStatistic.collaborator_count
     statement = (
         select(Task.name, count_collaborators)
-        .join(Task, Assignment.task_id == Task.id)
-        .join(Project, Project.id == Task.project_id)
-        .filter(Project.id == project_id)
-        .group_by(Task.id)
-        .having(count_collaborators >= min_collaborators)
+        .join(Task, TaskStatistic.task_id == Task.id)
+        .where(TaskStatistic.project_id == project_id,
+               count_collaborators > 0,
+               count_collaborators >= min_collaborators)
         .order_by(desc(count_collaborators))
     )
 
     if max_collaborators:
-        statement = statement.having(count_collaborators <= max_collaborators)
-    result = session.exec(statement).all()
+        statement = statement.where(count_collaborators <= max_collaborators)
+    result = (await session.exec(statement)).all()
     details = [
         ItemCount(name=task_name, count=collaborator_count)
         for task_name, collaborator_count in result
@@ -163,3 +187,23 @@ async def total_collaborators_by_task_and_project(
         description="Number of collaborators per project tasks.",
         details=details
     )
+
+
+# Contadores de acerto e falha do cache de respostas.
+@router.get("/cache",
+            response_model=dict[str, int],
+            status_code=status.HTTP_200_OK
+            )
+@query_budget(0)
+async def cache_statistics() -> dict[str, int]:
+    return cache.stats()
+
+
+# Assinantes do feed de mudanças (/events) e posição do buffer.
+@router.get("/changefeed",
+            response_model=dict[str, int],
+            status_code=status.HTTP_200_OK
+            )
+@query_budget(0)
+async def changefeed_statistics() -> dict[str, int]:
+    return feed.stats()
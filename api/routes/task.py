@@ -1,56 +1,183 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
-from sqlmodel import Session, select
-from sqlalchemy.orm import joinedload
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from sqlalchemy import delete, insert, update
+from sqlmodel.ext.asyncio.session import AsyncSession
 from starlette import status
 from datetime import datetime, timezone
 
 from database import get_session
+from api.bulk import bulk_body, existing_values, failure, insert_valid
+from api.constraints import execute_write
+from api.fields import (load_rows, parse_fields, parse_include,
+                        select_columns)
+from api.loaders import EMBED_LIMIT, load_task_collaborators
+from api.pagination import paginate, set_next_cursor
+from api.responses import fetch_rows, rows_response, select_rows
 from models.project import Project
-from models.task import Task
+from models.task import Task, TaskBase
+from models.collaborator import Collaborator
+from models.assignment import Assignment
+from dto.bulk_dto import (BulkDeleteResponse, BulkItemResult, BulkResponse,
+                          TaskBulkItem)
 from dto.task_dto import TaskWithCollaborator
+from services.cache import invalidate
+from services.changefeed import publish
+from services.profiler import query_budget
+from services.search import search
 
 router = APIRouter()
 
+# A única chave estrangeira de task é project_id.
+PROJECT_NOT_FOUND = {"FOREIGN KEY": (status.HTTP_404_NOT_FOUND,
+                                     "Project not found.")}
+
 
 @router.post("/project/{project_id}",
              response_model=Task,
              status_code=status.HTTP_201_CREATED
              )
+@query_budget(1)
 async def create_task_for_project(project_id: int,
                                   task: Task,
-                                  session: Session = Depends(get_session)
+                                  session: AsyncSession = Depends(get_session)
                                   ) -> Task:
-    project = session.get(Project, project_id)
-    if not project:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
-                            detail="Project not found.")
-    task.project_id = project_id
-    session.add(task)
-    session.commit()
-    session.refresh(task)
-    return task
+    statement = (insert(Task)
+                 .values({**task.model_dump(exclude={"id"}),
+                          "project_id": project_id})
+                 .returning(*Task.__table__.columns))
+    row = await execute_write(session, statement, PROJECT_NOT_FOUND)
+    await invalidate(f"project:{project_id}", "tasks")
+    publish("task", row["id"], "create", row["status"],
+            project_id=project_id)
+    return Task(**row)
+
+
+# Criar tarefas em lote, possivelmente de projetos diferentes. Os projetos
+# referenciados são validados numa só consulta e as tarefas válidas são
+# inseridas numa única transação; o resultado vem por item, na ordem do
+# corpo. Um projeto removido entre a consulta e o INSERT faz a chave
+# estrangeira falhar: os projetos são consultados de novo, e só as tarefas
+# dos que sumiram recebem 404 (mais duas consultas).
+@router.post("/bulk",
+             response_model=BulkResponse,
+             status_code=status.HTTP_200_OK
+             )
+@query_budget(4)
+async def create_tasks_bulk(tasks: list[TaskBulkItem] = bulk_body(),
+                            session: AsyncSession = Depends(get_session)
+                            ) -> BulkResponse:
+    async def check_projects(rows: list) -> tuple[list, list]:
+        projects = await existing_values(
+            session, Project.id, [row["project_id"] for _, row in rows])
+        valid, failures = [], []
+        for index, row in rows:
+            if row["project_id"] in projects:
+                valid.append((index, row))
+            else:
+                failures.append(failure(index, status.HTTP_404_NOT_FOUND,
+                                        "Project not found."))
+        return valid, failures
+
+    rows, failures = await check_projects(
+        [(index, task.model_dump(exclude={"id"}))
+         for index, task in enumerate(tasks)])
+    result = await insert_valid(session, insert(Task.__table__), rows,
+                                failures, revalidate=check_projects)
+    rows = dict(rows)
+    created = [(item.id, rows[item.index]) for item in result.items
+               if item.status_code == status.HTTP_201_CREATED]
+    if created:
+        await invalidate(*{f"project:{row['project_id']}"
+                           for _, row in created}, "tasks")
+        for task_id, row in created:
+            publish("task", task_id, "create", row["status"],
+                    project_id=row["project_id"])
+    return result
+
+
+# Remover tarefas em lote: um único DELETE ... RETURNING para todos os ids,
+# com as atribuições removidas pelo ON DELETE CASCADE. O resultado vem por
+# item, na ordem do corpo (204, ou 404 para ids inexistentes).
+@router.post("/bulk/delete",
+             response_model=BulkDeleteResponse,
+             status_code=status.HTTP_200_OK
+             )
+@query_budget(1)
+async def delete_tasks_bulk(task_ids: list[int] = bulk_body(),
+                            session: AsyncSession = Depends(get_session)
+                            ) -> BulkDeleteResponse:
+    result = await session.exec(delete(Task)
+                                .where(Task.id.in_(set(task_ids)))
+                                .returning(Task.id, Task.project_id))
+    deleted = dict(result.all())
+    await session.commit()
+    items = [BulkItemResult(index=index,
+                            status_code=status.HTTP_204_NO_CONTENT,
+                            id=task_id)
+             if task_id in deleted
+             else failure(index, status.HTTP_404_NOT_FOUND, "Task not found.")
+             for index, task_id in enumerate(task_ids)]
+    if deleted:
+        await invalidate(*{f"project:{project_id}"
+                           for project_id in deleted.values()},
+                         *(f"task:{task_id}" for task_id in deleted),
+                         "tasks", "assignments")
+        for task_id, project_id in deleted.items():
+            publish("task", task_id, "delete", project_id=project_id)
+    failed = sum(item.status_code != status.HTTP_204_NO_CONTENT
+                 for item in items)
+    return BulkDeleteResponse(deleted=len(deleted), failed=failed,
+                              items=items)
 
 
 @router.get("/project/{project_id}",
             response_model=list[TaskWithCollaborator],
             status_code=status.HTTP_200_OK
             )
+@query_budget(3)
 async def find_all_task_by_post_id(project_id: int,
+                                   response: Response,
                                    offset: int = Query(default=0, ge=0),
                                    limit: int = Query(default=10, le=100),
-                                   session: Session = Depends(get_session)
+                                   cursor: str | None = None,
+                                   collaborators_limit: int = Query(
+                                       default=EMBED_LIMIT, ge=0, le=100),
+                                   fields: str | None = None,
+                                   include: str | None = None,
+                                   session: AsyncSession = Depends(get_session)
                                    ) -> list[TaskWithCollaborator]:
-    project = session.get(Project, project_id)
+    project = await session.get(Project, project_id)
     if not project:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail="Project not found.")
-    statement = (select(Task)
-                 .where(Task.project_id == project_id)
-                 .offset(offset)
-                 .limit(limit)
-                 .options(joinedload(Task.collaborators)))
-    tasks_by_project = session.exec(statement).unique().all()
-    return tasks_by_project
+    selected = parse_fields(fields, Task, {"collaborators": Collaborator},
+                            TaskBase)
+    included = parse_include(include, ("collaborators",),
+                             ("collaborators",))
+    statement = paginate(select_columns(selected)
+                         .where(Task.project_id == project_id),
+                         Task.id, cursor, offset, limit)
+    tasks_by_project = await load_rows(
+        session, statement, selected, included,
+        {"collaborators": (load_task_collaborators, collaborators_limit)})
+    set_next_cursor(response, tasks_by_project, limit)
+    return rows_response(tasks_by_project, response)
+
+
+# Buscar tarefas por nome e descrição, ordenadas por relevância.
+@router.get("/search",
+            response_model=list[Task],
+            status_code=status.HTTP_200_OK
+            )
+@query_budget(1)
+async def search_tasks(q: str,
+                       project_id: int | None = None,
+                       limit: int = Query(default=10, le=100),
+                       session: AsyncSession = Depends(get_session)
+                       ) -> list[Task]:
+    statement = search(select_rows(Task), Task, q).limit(limit)
+    if project_id is not None:
+        statement = statement.where(Task.project_id == project_id)
+    return rows_response(await fetch_rows(session, statement))
 
 
 # Listar tasks por nome
@@ -58,56 +185,104 @@ async def find_all_task_by_post_id(project_id: int,
             response_model=list[TaskWithCollaborator],
             status_code=status.HTTP_200_OK
             )
+@query_budget(3)
 async def find_task_by_id(project_id: int,
                           name: str,
-                          session: Session = Depends(get_session)
+                          session: AsyncSession = Depends(get_session)
                           ) -> list[TaskWithCollaborator]:
-    project = session.get(Project, project_id)
+    project = await session.get(Project, project_id)
     if not project:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail="Project not found.")
-    statement = (select(Task).where(Task.project_id == project_id,
-                                    Task.name.ilike(f"%{name}%"))
-                 .options(joinedload(Task.project),
-                          joinedload(Task.collaborators)))
-    task = session.exec(statement).unique().all()
+    # Colaboradores numa segunda consulta por IN: o JOIN muitos-para-muitos
+    # varria a tabela collaborator.
+    selected = parse_fields(None, Task, {"collaborators": Collaborator},
+                            TaskBase)
+    statement = (search(select_columns(selected), Task, name,
+                        columns=("name",))
+                 .where(Task.project_id == project_id))
+    task = await load_rows(session, statement, selected, ("collaborators",),
+                           {"collaborators": (load_task_collaborators,
+                                              None)})
+    if not task:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail="Task not found.")
+    return rows_response(task)
+
+
+# Listar, paginados, os colaboradores de uma tarefa.
+@router.get("/{task_id}/collaborators",
+            response_model=list[Collaborator],
+            status_code=status.HTTP_200_OK
+            )
+@query_budget(2)
+async def find_task_collaborators(task_id: int,
+                                  response: Response,
+                                  offset: int = Query(default=0, ge=0),
+                                  limit: int = Query(default=10, le=100),
+                                  cursor: str | None = None,
+                                  session: AsyncSession = Depends(get_session)
+                                  ) -> list[Collaborator]:
+    task = await session.get(Task, task_id)
     if not task:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail="Task not found.")
-    return task
+    statement = paginate(select_rows(Collaborator)
+                         .join(Assignment,
+                               Assignment.collaborator_id == Collaborator.id)
+                         .where(Assignment.task_id == task_id),
+                         Collaborator.id, cursor, offset, limit)
+    collaborators = await fetch_rows(session, statement)
+    set_next_cursor(response, collaborators, limit)
+    return rows_response(collaborators, response)
 
 
 @router.put("/project/{project_id}/task/{task_id}",
             response_model=Task,
             status_code=status.HTTP_200_OK
             )
+@query_budget(1)
 async def update_task(project_id: int,
                       task_id: int,
                       update_task: Task,
-                      session: Session = Depends(get_session)) -> Task:
-    task = session.get(Task, task_id)
-    if not task or task.project_id != project_id:
+                      session: AsyncSession = Depends(get_session)) -> Task:
+    # project_id no corpo move a tarefa; um projeto inexistente falha na
+    # chave estrangeira.
+    statement = (update(Task)
+                 .where(Task.id == task_id, Task.project_id == project_id)
+                 .values({**update_task.model_dump(exclude_unset=True,
+                                                   exclude={"id"}),
+                          "updated_at": datetime.now(timezone.utc)})
+                 .returning(*Task.__table__.columns))
+    row = await execute_write(session, statement, PROJECT_NOT_FOUND)
+    if row is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail="Task not found")
-    for key, value in update_task.model_dump(exclude_unset=True).items():
-        setattr(task, key, value)
-    task.updated_at = datetime.now(timezone.utc)
-    session.add(task)
-    session.commit()
-    session.refresh(task)
-    return task
+    await invalidate(f"project:{project_id}", f"project:{row['project_id']}",
+                     f"task:{task_id}", "tasks")
+    moved = ({"previous_project_id": project_id}
+             if row["project_id"] != project_id else {})
+    publish("task", task_id, "update", row["status"],
+            project_id=row["project_id"], **moved)
+    return Task(**row)
 
 
 @router.delete("/project/{project_id}/task/{task_id}",
                status_code=status.HTTP_204_NO_CONTENT
                )
+@query_budget(1)
 async def delete_task(project_id: int,
                       task_id: int,
-                      session: Session = Depends(get_session)
+                      session: AsyncSession = Depends(get_session)
                       ):
-    task = session.get(Task, task_id)
-    if not task or task.project_id != project_id:
+    # As atribuições saem pelo ON DELETE CASCADE.
+    result = await session.exec(delete(Task)
+                                .where(Task.id == task_id,
+                                       Task.project_id == project_id))
+    if not result.rowcount:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail="Task not found")
-    session.delete(task)
-    session.commit()
+    await session.commit()
+    await invalidate(f"project:{project_id}", f"task:{task_id}", "tasks",
+                     "assignments")
+    publish("task", task_id, "delete", project_id=project_id)
@@ -0,0 +1,41 @@
+# Compara dois resultados de benchmarks.run, rota a rota.
+# Uso: python -m benchmarks.compare antes.json depois.json
+import json
+import sys
+
+METRICS = ("throughput_rps", "p50_ms", "p95_ms", "p99_ms",
+           "queries_per_request")
+
+
+def _change(before, after) -> str:
+    if before is None or after is None:
+        return f"{after}"
+    if not before:
+        return f"{after}"
+    return f"{after} ({(after - before) / before:+.0%})"
+
+
+def main() -> int:
+    if len(sys.argv) != 3:
+        print("usage: python -m benchmarks.compare BEFORE.json AFTER.json",
+              file=sys.stderr)
+        return 2
+    with open(sys.argv[1], encoding="utf-8") as file:
+        before = json.load(file)
+    with open(sys.argv[2], encoding="utf-8") as file:
+        after = json.load(file)
+    print(f"{before['commit']} -> {after['commit']}")
+    for name, result in after["results"].items():
+        previous = before["results"].get(name)
+        if previous is None:
+            print(f"{name}: new")
+            continue
+        changes = ", ".join(
+            f"{metric} {_change(previous.get(metric), result.get(metric))}"
+            for metric in METRICS)
+        print(f"{name}: {changes}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
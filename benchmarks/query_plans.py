@@ -0,0 +1,134 @@
+# Captura o SQL emitido por cada rota de leitura (eventos do engine), roda
+# EXPLAIN QUERY PLAN sobre uma base semeada por benchmarks.seed e compara
+# os planos com as expectativas de benchmarks/query_plans.json. Sai com
+# código 1 se algum plano regredir.
+# Uso: DATABASE_URL=sqlite:///bench.db python -m benchmarks.query_plans
+#      [--show] [--only texto ...]
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import sys
+
+import httpx
+from sqlalchemy import event
+
+from benchmarks.run import dataset
+from benchmarks.scenarios import SCENARIOS
+
+EXPECTATIONS = os.path.join(os.path.dirname(__file__), "query_plans.json")
+
+# SQL capturado da rota em execução: (instrução, parâmetros).
+captured: list[tuple[str, tuple]] | None = None
+
+
+def capture(conn, cursor, statement, parameters, context, executemany):
+    if captured is not None and not executemany \
+            and statement.lstrip().upper().startswith(("SELECT", "WITH")):
+        if (statement, parameters) not in captured:
+            captured.append((statement, parameters))
+
+
+def explain(connection, statement: str, parameters) -> list[str]:
+    rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}",
+                                      tuple(parameters or ())).all()
+    depth = {0: -1}
+    lines = []
+    for id, parent, _, detail in rows:
+        depth[id] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[id] + detail)
+    return lines
+
+
+# Cada rota tem listas de regex: "require" precisa casar com alguma linha
+# de algum plano da rota; "forbid" (somado ao "forbid" da chave "*") não
+# pode casar com nenhuma, exceto as que casam com "allow" (ex.: a varredura
+# em ordem de id, com LIMIT, de uma listagem paginada).
+def check(expectation: dict, plans: list[list[str]]) -> list[str]:
+    lines = [line.strip() for plan in plans for line in plan]
+    problems = []
+    for pattern in expectation.get("require", []):
+        if not any(re.search(pattern, line) for line in lines):
+            problems.append(f"missing /{pattern}/")
+    checked = [line for line in lines
+               if not any(re.search(pattern, line)
+                          for pattern in expectation.get("allow", []))]
+    for pattern in expectation.get("forbid", []):
+        for line in checked:
+            if re.search(pattern, line):
+                problems.append(f"forbidden /{pattern}/: {line}")
+    return problems
+
+
+async def collect(names: list[str], seed: int) -> dict[str, list]:
+    global captured
+    from database import get_async_engine, get_engine
+    from main import app
+
+    for target in (get_engine(), get_async_engine().sync_engine):
+        event.listen(target, "before_cursor_execute", capture)
+    data = dataset()
+    rng = random.Random(seed)
+    statements = {}
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app), httpx.AsyncClient(
+            transport=transport, base_url="http://plans") as client:
+        for name in names:
+            method, url, kwargs = await SCENARIOS[name](client, rng, data)
+            captured = []
+            await client.request(method, url, **kwargs)
+            statements[name], captured = captured, None
+    return statements
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--show", action="store_true",
+                        help="print every route's SQL and plan")
+    parser.add_argument("--only", nargs="*",
+                        help="check only routes containing these strings")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    # Sem cache, toda requisição chega ao banco.
+    os.environ["CACHE_BACKEND"] = "none"
+    with open(EXPECTATIONS, encoding="utf-8") as file:
+        expectations = json.load(file)
+    names = [name for name in SCENARIOS if name.startswith("GET ")
+             and (not args.only or any(part in name for part in args.only))]
+    statements = asyncio.run(collect(names, args.seed))
+
+    from database import get_engine
+    failures = 0
+    with get_engine().connect() as connection:
+        for name in names:
+            plans = [explain(connection, statement, parameters)
+                     for statement, parameters in statements[name]]
+            if name not in expectations:
+                status = "UNCHECKED"
+                problems = []
+            else:
+                expectation = {
+                    **expectations[name],
+                    "forbid": (expectations.get("*", {}).get("forbid", []) +
+                               expectations[name].get("forbid", [])),
+                }
+                problems = check(expectation, plans)
+                status = "FAIL" if problems else "ok"
+                failures += bool(problems)
+            print(f"[{status}] {name}")
+            for problem in problems:
+                print(f"    {problem}")
+            if args.show or problems:
+                for (statement, _), plan in zip(statements[name], plans):
+                    print("    " + " ".join(statement.split())[:160])
+                    for line in plan:
+                        print(f"      {line}")
+    print(f"{failures} route(s) with plan regressions.")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
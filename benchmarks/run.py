@@ -0,0 +1,218 @@
+# Mede cada rota da API com clientes concorrentes e grava o resultado em
+# JSON (com o commit), para comparar execuções com benchmarks.compare.
+#
+# Em processo (padrão), via ASGITransport, sobre a base de DATABASE_URL:
+#   DATABASE_URL=sqlite:///bench.db python -m benchmarks.run
+# Contra um servidor local (subido com DB_PROFILE=1 para as consultas por
+# requisição), lendo os ids da mesma base:
+#   DATABASE_URL=sqlite:///bench.db python -m benchmarks.run \
+#       --base-url http://127.0.0.1:8000
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import httpx
+
+from benchmarks.scenarios import SCENARIOS, Dataset
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def commit() -> str:
+    def git(*args: str) -> str:
+        return subprocess.run(["git", *args], capture_output=True,
+                              text=True).stdout.strip()
+    revision = git("rev-parse", "--short", "HEAD") or "unknown"
+    return f"{revision}-dirty" if git("status", "--porcelain", "-uno") \
+        else revision
+
+
+def dataset() -> Dataset:
+    from sqlalchemy import func, select
+
+    from database import get_engine
+    from models.collaborator import Collaborator
+    from models.project import Project
+    from models.task import Task
+
+    with get_engine().connect() as connection:
+        def max_id(column) -> int:
+            return connection.execute(select(func.max(column))).scalar() or 0
+        return Dataset(max_id(Project.id), max_id(Task.id),
+                       max_id(Collaborator.id))
+
+
+# Subida a frio de um worker, num processo novo: importação da aplicação e
+# entrada no lifespan (criação/migração do esquema ou só a verificação da
+# versão, conforme DB_AUTO_MIGRATE).
+STARTUP_SCRIPT = """
+import asyncio, json, time
+start = time.perf_counter()
+from main import app
+imported = time.perf_counter()
+async def main():
+    lifespan = app.router.lifespan_context(app)
+    await lifespan.__aenter__()
+    ready = time.perf_counter()
+    await lifespan.__aexit__(None, None, None)
+    print(json.dumps({"import_ms": round((imported - start) * 1000, 1),
+                      "lifespan_ms": round((ready - imported) * 1000, 1),
+                      "total_ms": round((ready - start) * 1000, 1)}))
+asyncio.run(main())
+"""
+
+
+def startup_time() -> dict:
+    results = {}
+    for label, auto_migrate in (("auto_migrate", "1"), ("check_only", "0")):
+        process = subprocess.run(
+            [sys.executable, "-c", STARTUP_SCRIPT], capture_output=True,
+            text=True, env={**os.environ, "DB_AUTO_MIGRATE": auto_migrate})
+        results[label] = (json.loads(process.stdout.splitlines()[-1])
+                          if process.returncode == 0
+                          else {"error": process.stderr.strip()[-500:]})
+    return results
+
+
+def percentile(values: list[float], percent: int) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method="inclusive")[
+        percent - 1]
+
+
+async def measure(client: httpx.AsyncClient, name: str, data: Dataset,
+                  rng: random.Random, requests: int, concurrency: int,
+                  warmup: int) -> dict:
+    # O preparo (montar as requisições e criar o que elas consomem) roda
+    # antes e fora da medição.
+    prepared = [await SCENARIOS[name](client, rng, data)
+                for _ in range(warmup + requests)]
+    for method, url, kwargs in prepared[:warmup]:
+        await client.request(method, url, **kwargs)
+
+    pending = iter(prepared[warmup:])
+    latencies, queries, statuses = [], [], {}
+
+    async def worker() -> None:
+        for method, url, kwargs in pending:
+            start = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            latencies.append((time.perf_counter() - start) * 1000)
+            statuses[response.status_code] = \
+                statuses.get(response.status_code, 0) + 1
+            if "x-db-queries" in response.headers:
+                queries.append(int(response.headers["x-db-queries"]))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {
+        "requests": requests,
+        "errors": sum(count for code, count in statuses.items()
+                      if code >= 400),
+        "status_codes": {str(code): count
+                         for code, count in sorted(statuses.items())},
+        "throughput_rps": round(requests / elapsed, 1),
+        "mean_ms": round(statistics.fmean(latencies), 2),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "queries_per_request": (round(statistics.fmean(queries), 2)
+                                if queries else None),
+    }
+
+
+async def run(args) -> dict:
+    names = [name for name in SCENARIOS
+             if not args.only or any(part in name for part in args.only)]
+    data = dataset()
+    if not data.projects or not data.tasks or not data.collaborators:
+        raise SystemExit("Empty database; run python -m benchmarks.seed "
+                         "first.")
+    rng = random.Random(args.seed)
+    results = {}
+    startup = startup_time()
+    for label, timing in startup.items():
+        print(f"startup ({label}): {timing}")
+
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=60)
+        lifespan = None
+    else:
+        from main import app
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app),
+                                   base_url="http://bench", timeout=60)
+        lifespan = app.router.lifespan_context(app)
+        await lifespan.__aenter__()
+    try:
+        async with client:
+            for name in names:
+                results[name] = await measure(client, name, data, rng,
+                                              args.requests,
+                                              args.concurrency, args.warmup)
+                result = results[name]
+                print(f"{name:<66} {result['throughput_rps']:>8} rps "
+                      f"p50 {result['p50_ms']:>8} p95 {result['p95_ms']:>8} "
+                      f"p99 {result['p99_ms']:>8} ms "
+                      f"q/req {result['queries_per_request']} "
+                      f"err {result['errors']}")
+    finally:
+        if lifespan:
+            await lifespan.__aexit__(None, None, None)
+    return {
+        "commit": commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "target": args.base_url or "asgi",
+        "database_url": os.getenv("DATABASE_URL"),
+        "database_mode": os.getenv("DATABASE_MODE", "async"),
+        "cache_backend": os.getenv("CACHE_BACKEND", "memory"),
+        "dataset": vars(data),
+        "startup": startup,
+        "settings": {"requests": args.requests,
+                     "concurrency": args.concurrency,
+                     "warmup": args.warmup, "seed": args.seed},
+        "results": results,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url",
+                        help="running server (default: in-process ASGI)")
+    parser.add_argument("--requests", type=int, default=200,
+                        help="measured requests per route (default: 200)")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", nargs="*",
+                        help="run only routes containing these strings")
+    parser.add_argument("--output",
+                        help="JSON file (default: benchmarks/results/)")
+    args = parser.parse_args()
+
+    # Em processo, o profiler fornece X-DB-Queries.
+    if not args.base_url:
+        os.environ.setdefault("DB_PROFILE", "1")
+    report = asyncio.run(run(args))
+    output = args.output or os.path.join(
+        RESULTS_DIR,
+        f"{datetime.now():%Y%m%d-%H%M%S}-{report['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+    print(f"Results written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,301 @@
+import random
+from dataclasses import dataclass
+from datetime import date
+from typing import Awaitable, Callable
+
+import httpx
+
+from benchmarks.seed import WORDS
+
+
+@dataclass
+class Dataset:
+    projects: int
+    tasks: int
+    collaborators: int
+
+
+# Requisição a ser medida: (método, url, kwargs do httpx).
+Request = tuple[str, str, dict]
+
+# Um cenário monta a requisição medida; pode antes fazer requisições de
+# preparo (ex.: criar o projeto que será apagado), que não entram na medida.
+Scenario = Callable[[httpx.AsyncClient, random.Random, Dataset],
+                    Awaitable[Request]]
+
+SCENARIOS: dict[str, Scenario] = {}
+
+
+def scenario(name: str):
+    def register(function: Scenario) -> Scenario:
+        SCENARIOS[name] = function
+        return function
+    return register
+
+
+def _email(rng: random.Random) -> str:
+    return f"bench-{rng.getrandbits(64):x}@example.com"
+
+
+def _project(rng: random.Random) -> dict:
+    return {"name": f"bench {rng.choice(WORDS)}", "description": "bench"}
+
+
+def _task(rng: random.Random) -> dict:
+    return {"name": f"bench {rng.choice(WORDS)}", "description": "bench",
+            "project_id": 0}
+
+
+def _collaborator(rng: random.Random) -> dict:
+    return {"name": "Bench", "email": _email(rng), "function": "dev"}
+
+
+async def _create(client: httpx.AsyncClient, url: str, body: dict) -> dict:
+    response = await client.post(url, json=body)
+    response.raise_for_status()
+    return response.json()
+
+
+# Projects
+@scenario("POST /projects/")
+async def create_project(client, rng, data):
+    return "POST", "/projects/", {"json": _project(rng)}
+
+
+@scenario("GET /projects/")
+async def list_projects(client, rng, data):
+    return "GET", "/projects/", {"params": {"limit": 20}}
+
+
+@scenario("GET /projects/?fields")
+async def list_projects_sparse(client, rng, data):
+    return "GET", "/projects/", {"params": {"fields": "name,tasks.name"}}
+
+
+@scenario("GET /projects/search")
+async def search_projects(client, rng, data):
+    return "GET", "/projects/search", {"params": {"q": rng.choice(WORDS)}}
+
+
+@scenario("GET /projects/{id}")
+async def get_project(client, rng, data):
+    return "GET", f"/projects/{rng.randint(1, data.projects)}", {}
+
+
+@scenario("GET /projects/{id}/tasks")
+async def get_project_tasks(client, rng, data):
+    return "GET", f"/projects/{rng.randint(1, data.projects)}/tasks", {}
+
+
+@scenario("GET /projects/titles/name/search")
+async def search_project_titles(client, rng, data):
+    return ("GET", "/projects/titles/name/search",
+            {"params": {"name": rng.choice(WORDS)}})
+
+
+@scenario("GET /projects/titles/{year}")
+async def project_titles_by_year(client, rng, data):
+    year = date.today().year - rng.randint(0, 2)
+    return ("GET", f"/projects/titles/{year}",
+            {"params": {"month": rng.randint(1, 12)}})
+
+
+@scenario("PUT /projects/{id}")
+async def update_project(client, rng, data):
+    return ("PUT", f"/projects/{rng.randint(1, data.projects)}",
+            {"json": {"name": f"bench {rng.choice(WORDS)}",
+                      "description": "bench"}})
+
+
+@scenario("DELETE /projects/{id}")
+async def delete_project(client, rng, data):
+    project = await _create(client, "/projects/", _project(rng))
+    return "DELETE", f"/projects/{project['id']}", {}
+
+
+# Tasks
+@scenario("POST /tasks/project/{id}")
+async def create_task(client, rng, data):
+    return ("POST", f"/tasks/project/{rng.randint(1, data.projects)}",
+            {"json": _task(rng)})
+
+
+@scenario("POST /tasks/bulk")
+async def create_tasks_bulk(client, rng, data):
+    tasks = [{**_task(rng), "project_id": rng.randint(1, data.projects)}
+             for _ in range(100)]
+    return "POST", "/tasks/bulk", {"json": tasks}
+
+
+@scenario("GET /tasks/project/{id}")
+async def list_project_tasks(client, rng, data):
+    return "GET", f"/tasks/project/{rng.randint(1, data.projects)}", {}
+
+
+@scenario("GET /tasks/search")
+async def search_tasks(client, rng, data):
+    return "GET", "/tasks/search", {"params": {"q": rng.choice(WORDS)}}
+
+
+@scenario("GET /tasks/project/{id}/tasks/{name}")
+async def find_tasks_by_name(client, rng, data):
+    return ("GET", f"/tasks/project/{rng.randint(1, data.projects)}"
+            f"/tasks/{rng.choice(WORDS)}", {})
+
+
+@scenario("GET /tasks/{id}/collaborators")
+async def get_task_collaborators(client, rng, data):
+    return "GET", f"/tasks/{rng.randint(1, data.tasks)}/collaborators", {}
+
+
+@scenario("PUT /tasks/project/{id}/task/{id}")
+async def update_task(client, rng, data):
+    project_id = rng.randint(1, data.projects)
+    task = await _create(client, f"/tasks/project/{project_id}", _task(rng))
+    return ("PUT", f"/tasks/project/{project_id}/task/{task['id']}",
+            {"json": {"name": "bench", "description": "bench",
+                      "status": "doing"}})
+
+
+@scenario("DELETE /tasks/project/{id}/task/{id}")
+async def delete_task(client, rng, data):
+    project_id = rng.randint(1, data.projects)
+    task = await _create(client, f"/tasks/project/{project_id}", _task(rng))
+    return "DELETE", f"/tasks/project/{project_id}/task/{task['id']}", {}
+
+
+@scenario("POST /tasks/bulk/delete")
+async def delete_tasks_bulk(client, rng, data):
+    tasks = [{**_task(rng), "project_id": rng.randint(1, data.projects)}
+             for _ in range(100)]
+    created = await _create(client, "/tasks/bulk", tasks)
+    return ("POST", "/tasks/bulk/delete",
+            {"json": [item["id"] for item in created["items"]
+                      if item["id"] is not None]})
+
+
+# Collaborators
+@scenario("POST /collaborators/")
+async def create_collaborator(client, rng, data):
+    return "POST", "/collaborators/", {"json": _collaborator(rng)}
+
+
+@scenario("POST /collaborators/bulk")
+async def create_collaborators_bulk(client, rng, data):
+    return ("POST", "/collaborators/bulk",
+            {"json": [_collaborator(rng) for _ in range(100)]})
+
+
+@scenario("POST /collaborators/assignments")
+async def create_assignment(client, rng, data):
+    collaborator = await _create(client, "/collaborators/",
+                                 _collaborator(rng))
+    return ("POST", "/collaborators/assignments",
+            {"json": {"task_id": rng.randint(1, data.tasks),
+                      "collaborator_id": collaborator["id"]}})
+
+
+@scenario("POST /collaborators/assignments/bulk")
+async def create_assignments_bulk(client, rng, data):
+    collaborator = await _create(client, "/collaborators/",
+                                 _collaborator(rng))
+    task_ids = rng.sample(range(1, data.tasks + 1), min(100, data.tasks))
+    return ("POST", "/collaborators/assignments/bulk",
+            {"json": [{"task_id": task_id,
+                       "collaborator_id": collaborator["id"]}
+                      for task_id in task_ids]})
+
+
+@scenario("GET /collaborators/")
+async def list_collaborators(client, rng, data):
+    return "GET", "/collaborators/", {"params": {"limit": 20}}
+
+
+@scenario("GET /collaborators/tasks/search/email")
+async def find_tasks_by_email(client, rng, data):
+    id = rng.randint(1, data.collaborators)
+    return ("GET", "/collaborators/tasks/search/email",
+            {"params": {"email": f"colaborador{id}@example.com"}})
+
+
+@scenario("GET /collaborators/search")
+async def search_collaborators(client, rng, data):
+    return ("GET", "/collaborators/search",
+            {"params": {"q": f"colaborador{rng.randint(1, 999)}"}})
+
+
+@scenario("GET /collaborators/{id}")
+async def get_collaborator(client, rng, data):
+    return "GET", f"/collaborators/{rng.randint(1, data.collaborators)}", {}
+
+
+@scenario("GET /collaborators/{id}/tasks")
+async def get_collaborator_tasks(client, rng, data):
+    return ("GET",
+            f"/collaborators/{rng.randint(1, data.collaborators)}/tasks", {})
+
+
+@scenario("PUT /collaborators/{id}")
+async def update_collaborator(client, rng, data):
+    return ("PUT", f"/collaborators/{rng.randint(1, data.collaborators)}",
+            {"json": {"function": rng.choice(("dev", "qa", "pm"))}})
+
+
+@scenario("DELETE /collaborators/{id}")
+async def delete_collaborator(client, rng, data):
+    collaborator = await _create(client, "/collaborators/",
+                                 _collaborator(rng))
+    return "DELETE", f"/collaborators/{collaborator['id']}", {}
+
+
+# Statistic
+@scenario("GET /statistic/projects/total")
+async def total_projects(client, rng, data):
+    return "GET", "/statistic/projects/total", {}
+
+
+@scenario("GET /statistic/projects/total/tasks/filtered")
+async def total_tasks_by_project(client, rng, data):
+    return ("GET", "/statistic/projects/total/tasks/filtered",
+            {"params": {"min_tasks": rng.randint(0, 200)}})
+
+
+@scenario("GET /statistic/projects/total/status")
+async def total_projects_by_status(client, rng, data):
+    return "GET", "/statistic/projects/total/status", {}
+
+
+@scenario("GET /statistic/projects/{id}/tasks/total/status")
+async def total_tasks_by_status(client, rng, data):
+    return ("GET", f"/statistic/projects/{rng.randint(1, data.projects)}"
+            "/tasks/total/status", {})
+
+
+@scenario("GET /statistic/tasks/total/collaborators/filtered/projects/{id}")
+async def total_collaborators_by_task(client, rng, data):
+    return ("GET", "/statistic/tasks/total/collaborators/filtered/projects/"
+            f"{rng.randint(1, data.projects)}", {})
+
+
+@scenario("GET /statistic/cache")
+async def cache_statistics(client, rng, data):
+    return "GET", "/statistic/cache", {}
+
+
+# Export
+@scenario("GET /export/projects")
+async def export_projects(client, rng, data):
+    return "GET", "/export/projects", {"params": {"status": "doing"}}
+
+
+@scenario("GET /export/tasks")
+async def export_tasks(client, rng, data):
+    return ("GET", "/export/tasks",
+            {"params": {"project_id": rng.randint(1, data.projects),
+                        "format": rng.choice(("ndjson", "csv"))}})
+
+
+@scenario("GET /export/assignments")
+async def export_assignments(client, rng, data):
+    return ("GET", "/export/assignments",
+            {"params": {"project_id": rng.randint(1, data.projects)}})
@@ -0,0 +1,127 @@
+# Gera uma base sintética e determinística (mesma --seed, mesmos dados) para
+# os benchmarks. A base apontada por DATABASE_URL deve estar vazia.
+# Uso: DATABASE_URL=sqlite:///bench.db python -m benchmarks.seed \
+#          --projects 10000 --tasks 1000000 --collaborators 100000
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, select
+
+from database import create_db_and_tables, get_engine
+from models.assignment import Assignment
+from models.collaborator import Collaborator
+from models.enum.status_enum import StatusEnum
+from models.project import Project
+from models.task import Task
+
+CHUNK = 10_000
+
+WORDS = ("api", "backend", "cadastro", "dashboard", "deploy", "design",
+         "docs", "frontend", "integração", "migração", "mobile", "pagamento",
+         "relatório", "release", "segurança", "suporte", "testes", "infra")
+
+# Colaboradores por tarefa: a maioria tem 1 a 3, poucas têm muitos.
+FANOUT = {0: 10, 1: 30, 2: 25, 3: 15, 4: 8, 6: 7, 10: 4, 20: 1}
+
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def _created_at(rng: random.Random, now: datetime) -> datetime:
+    return now - timedelta(seconds=rng.randrange(3 * 365 * 24 * 3600))
+
+
+def _insert(table, rows, label: str) -> int:
+    total = 0
+    chunk = []
+    start = time.perf_counter()
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == CHUNK:
+            total += _flush(table, chunk)
+            chunk = []
+    total += _flush(table, chunk)
+    elapsed = time.perf_counter() - start
+    print(f"{label}: {total} rows in {elapsed:.1f}s")
+    return total
+
+
+def _flush(table, chunk: list[dict]) -> int:
+    if chunk:
+        with get_engine().begin() as connection:
+            connection.execute(insert(table), chunk)
+    return len(chunk)
+
+
+def seed(projects: int, tasks: int, collaborators: int,
+         seed: int = 42) -> None:
+    rng = random.Random(seed)
+    now = datetime.now()
+    statuses = list(StatusEnum)
+
+    def project_rows():
+        for id in range(1, projects + 1):
+            created = _created_at(rng, now)
+            yield {"id": id, "name": f"{_text(rng, 2)} {id}",
+                   "description": _text(rng, 8), "created_at": created,
+                   "updated_at": created, "status": rng.choice(statuses)}
+
+    def collaborator_rows():
+        for id in range(1, collaborators + 1):
+            yield {"id": id, "name": f"Colaborador {id}",
+                   "email": f"colaborador{id}@example.com",
+                   "function": rng.choice(("dev", "qa", "pm", "design"))}
+
+    # Tamanho dos projetos com cauda longa: poucos projetos concentram
+    # muitas tarefas.
+    def task_rows():
+        for id in range(1, tasks + 1):
+            created = _created_at(rng, now)
+            project_id = min(int(projects * rng.random() ** 2) + 1, projects)
+            yield {"id": id, "name": f"{_text(rng, 3)} {id}",
+                   "description": _text(rng, 12), "created_at": created,
+                   "updated_at": created, "status": rng.choice(statuses),
+                   "project_id": project_id}
+
+    def assignment_rows():
+        sizes, weights = zip(*FANOUT.items())
+        for task_id in range(1, tasks + 1):
+            size = min(rng.choices(sizes, weights)[0], collaborators)
+            members = set()
+            while len(members) < size:
+                members.add(int(collaborators * rng.random() ** 2) + 1)
+            for collaborator_id in sorted(members):
+                yield {"task_id": task_id, "collaborator_id": collaborator_id}
+
+    _insert(Project.__table__, project_rows(), "projects")
+    _insert(Collaborator.__table__, collaborator_rows(), "collaborators")
+    _insert(Task.__table__, task_rows(), "tasks")
+    _insert(Assignment.__table__, assignment_rows(), "assignments")
+    with get_engine().begin() as connection:
+        connection.exec_driver_sql("ANALYZE")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--projects", type=int, default=1000)
+    parser.add_argument("--tasks", type=int, default=100_000)
+    parser.add_argument("--collaborators", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    create_db_and_tables()
+    with get_engine().connect() as connection:
+        if connection.execute(select(func.count(Project.id))).scalar():
+            print("Database is not empty; point DATABASE_URL to a new file.",
+                  file=sys.stderr)
+            return 1
+    seed(args.projects, args.tasks, args.collaborators, args.seed)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,29 +1,240 @@
-import sqlite3
 from sqlmodel import create_engine, Session, SQLModel
-from sqlalchemy import event, Engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import Engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import Pool, StaticPool
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
+from services.metrics import TimedAsyncAdaptedQueuePool, TimedQueuePool
+from migrations import (SCHEMA_VERSION, migrate, restore_indexes,
+                        schema_version)
+from typing import Callable
 import os
 import logging
 
+load_dotenv()
+
 logging.basicConfig()
-logging.getLogger("sqlalchemy.engine").setLevel(logging.INFO)
+# Log de todas as instruções SQL; custa CPU, por isso fica desligado.
+if os.getenv("DB_ECHO", "0").lower() in ("1", "true"):
+    logging.getLogger("sqlalchemy.engine").setLevel(logging.INFO)
 
-load_dotenv()
+DATABASE_URL = os.getenv("DATABASE_URL")
+# Um banco SQLite em memória pertence à conexão que o abriu: as tabelas
+# criadas pelo engine síncrono não existiriam para o do aiosqlite. Os dois
+# abrem então o mesmo banco em memória compartilhado, cada um com uma única
+# conexão (StaticPool), que o mantém vivo enquanto o processo roda.
+MEMORY_DATABASE_URL = ("sqlite:///file:memdb?mode=memory&cache=shared"
+                       "&uri=true")
+if DATABASE_URL and make_url(DATABASE_URL).get_backend_name() == "sqlite" \
+        and make_url(DATABASE_URL).database in (None, "", ":memory:"):
+    DATABASE_URL = MEMORY_DATABASE_URL
+# "async" (padrão) usa aiosqlite; "sync" mantém a Session bloqueante
+# original, para comparar o throughput sobre a mesma base.
+DATABASE_MODE = os.getenv("DATABASE_MODE", "async")
+# Com 1 (padrão, desenvolvimento), a aplicação cria as tabelas e migra a
+# base ao subir. Com 0 (produção, scripts/serve.py), ela só confere a versão
+# gravada por `python -m scripts.migrate`, sem DDL em cada worker.
+DB_AUTO_MIGRATE = os.getenv("DB_AUTO_MIGRATE", "1").lower() in ("1", "true")
+
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite"}
+
+
+def async_database_url(url: str) -> str:
+    url = make_url(url)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername)
+    return url.set(drivername=driver).render_as_string(hide_password=False)
+
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "-1"))
+
+# Aplicados em cada nova conexão SQLite; valor vazio mantém o padrão.
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "busy_timeout": os.getenv("SQLITE_BUSY_TIMEOUT", "5000"),
+    "mmap_size": os.getenv("SQLITE_MMAP_SIZE", ""),
+    "cache_size": os.getenv("SQLITE_CACHE_SIZE", ""),
+}
+
+
+def pool_options(url: str, poolclass: type[Pool]) -> dict:
+    # Bancos em memória usam uma conexão única, sem dimensionamento. Em
+    # arquivo, o aiosqlite usaria NullPool (uma conexão por sessão).
+    if make_url(url).query.get("mode") == "memory":
+        return {"poolclass": StaticPool,
+                "connect_args": {"check_same_thread": False}}
+    return {
+        "poolclass": poolclass,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+    }
+
+
+# Os engines são criados no primeiro uso, já dentro do processo do worker:
+# nada de pool (nem conexão) herdado de antes do fork. Quem precisa
+# instrumentá-los registra um hook, chamado com (engine, nome) para cada
+# engine criado, inclusive os que já existiam.
+engine_hooks: list[Callable[[Engine, str], None]] = []
+engines: dict[str, Engine] = {}
+_engine: Engine | None = None
+_async_engine: AsyncEngine | None = None
+
+
+def add_engine_hook(hook: Callable[[Engine, str], None]) -> None:
+    engine_hooks.append(hook)
+    for name, engine in engines.items():
+        hook(engine, name)
+
+
+def register_engine(engine: Engine, name: str) -> None:
+    event.listen(engine, "connect", set_sqlite_pragma)
+    engines[name] = engine
+    for hook in engine_hooks:
+        hook(engine, name)
+
+
+def get_engine() -> Engine:
+    global _engine
+    if _engine is None:
+        _engine = create_engine(DATABASE_URL,
+                                **pool_options(DATABASE_URL, TimedQueuePool))
+        register_engine(_engine, "sync")
+    return _engine
+
+
+def get_async_engine() -> AsyncEngine:
+    global _async_engine
+    if _async_engine is None:
+        _async_engine = create_async_engine(
+            async_database_url(DATABASE_URL),
+            **pool_options(DATABASE_URL,
+                           TimedAsyncAdaptedQueuePool))
+        register_engine(_async_engine.sync_engine, "async")
+    return _async_engine
+
+
+class SyncResult:
+    # Contraparte síncrona do AsyncResult devolvido por AsyncSession.stream.
+    def __init__(self, result):
+        self.result = result
 
-engine = create_engine(os.getenv("DATABASE_URL"))
+    def keys(self):
+        return self.result.keys()
 
+    async def partitions(self, size: int | None = None):
+        for partition in self.result.partitions(size):
+            yield partition
 
-def create_db_and_tables() -> None:
+
+class SyncSession:
+    # Expõe a mesma interface da AsyncSession sobre uma Session síncrona.
+    # As chamadas bloqueiam o event loop, exatamente como antes.
+    def __init__(self, session: Session):
+        self.sync_session = session
+
+    def add(self, instance) -> None:
+        self.sync_session.add(instance)
+
+    def add_all(self, instances) -> None:
+        self.sync_session.add_all(instances)
+
+    async def exec(self, statement, **kwargs):
+        return self.sync_session.exec(statement, **kwargs)
+
+    async def execute(self, statement, *args, **kwargs):
+        return self.sync_session.execute(statement, *args, **kwargs)
+
+    async def stream(self, statement, **kwargs) -> SyncResult:
+        return SyncResult(self.sync_session.execute(statement, **kwargs))
+
+    async def scalar(self, statement, *args, **kwargs):
+        return self.sync_session.scalar(statement, *args, **kwargs)
+
+    async def get(self, entity, ident, **kwargs):
+        return self.sync_session.get(entity, ident, **kwargs)
+
+    async def delete(self, instance) -> None:
+        self.sync_session.delete(instance)
+
+    async def flush(self) -> None:
+        self.sync_session.flush()
+
+    async def commit(self) -> None:
+        self.sync_session.commit()
+
+    async def rollback(self) -> None:
+        self.sync_session.rollback()
+
+    async def refresh(self, instance, **kwargs) -> None:
+        self.sync_session.refresh(instance, **kwargs)
+
+    async def close(self) -> None:
+        self.sync_session.close()
+
+
+# O create_all não altera tabelas existentes; os índices e demais mudanças
+# de esquema em bases antigas são aplicados pelas migrações. Em seguida são
+# recriados os índices que faltem, como os de uma carga --drop-indexes
+# interrompida; o importador, que cuida dos seus pelo checkpoint, pula essa
+# etapa. Os workers (DB_AUTO_MIGRATE=0) não executam DDL na subida.
+def create_db_and_tables(indexes: bool = True) -> int:
+    engine = get_engine()
     SQLModel.metadata.create_all(engine)
+    version = migrate(engine)
+    if indexes:
+        with engine.begin() as connection:
+            restore_indexes(connection)
+    return version
+
 
+def check_schema_version() -> None:
+    with get_engine().connect() as connection:
+        version = schema_version(connection)
+    if version != SCHEMA_VERSION:
+        raise RuntimeError(
+            f"Database schema is at version {version}, expected "
+            f"{SCHEMA_VERSION}; run python -m scripts.migrate.")
 
-def get_session() -> Session:
-    return Session(engine)
 
+async def dispose_engines() -> None:
+    if _async_engine is not None:
+        await _async_engine.dispose()
+    if _engine is not None:
+        _engine.dispose()
 
-@event.listens_for(Engine, "connect")
+
+# A sessão é fechada ao fim de cada requisição, inclusive em caso de erro,
+# devolvendo a conexão ao pool.
+async def get_session():
+    if DATABASE_MODE == "sync":
+        with Session(get_engine()) as session:
+            yield SyncSession(session)
+    else:
+        async with AsyncSession(get_async_engine(),
+                                expire_on_commit=False) as session:
+            yield session
+
+
+# O aiosqlite entrega um adaptador, não um sqlite3.Connection, por isso o
+# hook é registrado em cada engine (register_engine) e testa o dialeto.
 def set_sqlite_pragma(dbapi_connection, connection_record):
-    if type(dbapi_connection) is sqlite3.Connection:
+    if make_url(DATABASE_URL).get_backend_name() == "sqlite":
         cursor = dbapi_connection.cursor()
         cursor.execute("PRAGMA foreign_keys=ON")
+        for name, value in SQLITE_PRAGMAS.items():
+            if value:
+                cursor.execute(f"PRAGMA {name}={value}")
         cursor.close()
+
+
+# Sessão fora do ciclo de dependências do FastAPI: as dependências com yield
+# encerram antes de o corpo de uma StreamingResponse ser enviado, então o
+# gerador do corpo precisa abrir (e fechar) a sua.
+session_scope = asynccontextmanager(get_session)
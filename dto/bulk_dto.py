@@ -0,0 +1,31 @@
+from pydantic import BaseModel
+
+from models.task import TaskBase
+
+
+class TaskBulkItem(TaskBase):
+    project_id: int
+
+
+class AssignmentBulkItem(BaseModel):
+    task_id: int
+    collaborator_id: int
+
+
+class BulkItemResult(BaseModel):
+    index: int
+    status_code: int
+    id: int | None = None
+    detail: str | None = None
+
+
+class BulkResponse(BaseModel):
+    created: int
+    failed: int
+    items: list[BulkItemResult]
+
+
+class BulkDeleteResponse(BaseModel):
+    deleted: int
+    failed: int
+    items: list[BulkItemResult]
@@ -1,15 +1,43 @@
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
-from database import create_db_and_tables
+from database import (DB_AUTO_MIGRATE, add_engine_hook, check_schema_version,
+                      create_db_and_tables, dispose_engines)
 
 from api.controller import api_router
+from services import metrics, profiler
+from services.write_batcher import batcher
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    create_db_and_tables()
+    if DB_AUTO_MIGRATE:
+        create_db_and_tables()
+    else:
+        check_schema_version()
+    if batcher is not None:
+        await batcher.start()
     yield
+    if batcher is not None:
+        await batcher.stop()
+    await dispose_engines()
 
-app = FastAPI(lifespan=lifespan)
+# As respostas validadas pelo response_model também são codificadas pelo
+# orjson; as leituras que já montam dicts usam api/responses.py.
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 app.include_router(api_router)
+
+# Os engines nascem no primeiro uso; os hooks os instrumentam nesse momento.
+# Os orçamentos de consultas dependem da mesma contagem do profiler.
+if profiler.DB_PROFILE or profiler.DB_QUERY_BUDGET_MODE != "off":
+    add_engine_hook(lambda engine, name: profiler.instrument(engine))
+    app.add_middleware(profiler.QueryProfilerMiddleware)
+
+# Adicionado por último para envolver os demais middlewares e medir a
+# requisição inteira.
+if metrics.METRICS:
+    add_engine_hook(metrics.instrument)
+    app.add_middleware(metrics.MetricsMiddleware)
+    app.add_api_route("/metrics", metrics.metrics_endpoint,
+                      include_in_schema=False)
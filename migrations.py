@@ -0,0 +1,172 @@
+from sqlalchemy import Connection, Engine, Table
+from sqlalchemy.schema import CreateIndex
+from sqlmodel import SQLModel
+
+import models.project  # noqa: F401  (registra todas as tabelas)
+from models.assignment import Assignment
+from models.statistic import ProjectStatistic, ProjectStatusStatistic
+from services.search import create_search_index
+from services.statistics import create_statistics
+
+
+# Cada passo recebe uma conexão em transação e deve ser idempotente, pois
+# numa base nova as tabelas (e índices) já foram criadas pelo create_all.
+# A versão aplicada fica em PRAGMA user_version. Todos os passos pendentes
+# e a nova versão são gravados numa única transação (ver migrate()).
+def create_indexes(*names: str):
+    def step(connection: Connection) -> None:
+        indexes = {
+            index.name: index
+            for table in SQLModel.metadata.sorted_tables
+            for index in table.indexes
+        }
+        for name in names:
+            indexes[name].create(connection, checkfirst=True)
+    return step
+
+
+# Recria, com CREATE INDEX IF NOT EXISTS, os índices do modelo que faltem
+# na base, como os removidos por uma carga --drop-indexes interrompida (ver
+# services/importer.py). Índices presentes não custam nada.
+def restore_indexes(connection: Connection) -> None:
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            connection.execute(CreateIndex(index, if_not_exists=True))
+
+
+# Índices que saíram do modelo.
+def drop_indexes(*names: str):
+    def step(connection: Connection) -> None:
+        for name in names:
+            connection.exec_driver_sql(f"DROP INDEX IF EXISTS {name}")
+    return step
+
+
+# ALTER TABLE ... ADD COLUMN para colunas novas de tabelas já existentes;
+# o tipo, o DEFAULT e o NOT NULL vêm do modelo (o SQLite só aceita NOT NULL
+# com um DEFAULT). Colunas presentes são ignoradas.
+def add_columns(*columns):
+    def step(connection: Connection) -> None:
+        for column in columns:
+            table = column.table.name
+            existing = {row[1] for row in connection.exec_driver_sql(
+                f"PRAGMA table_info({table})")}
+            if column.name not in existing:
+                definition = column.type.compile(connection.dialect)
+                if column.server_default is not None:
+                    definition += f" DEFAULT {column.server_default.arg}"
+                    if not column.nullable:
+                        definition += " NOT NULL"
+                connection.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN "
+                                           f"{column.name} {definition}")
+    return step
+
+
+# O SQLite não altera chaves estrangeiras: a tabela é recriada a partir do
+# modelo quando alguma FK de `column` não tem o ON DELETE esperado. Linhas
+# órfãs (de antes de foreign_keys=ON) não são copiadas. Os triggers da
+# tabela antiga somem com ela; recrie-os no passo seguinte. Uma `<tabela>_old`
+# deixada por uma execução interrompida de versões anteriores (que não
+# rodavam as migrações numa transação) volta a ser a tabela antes da checagem.
+def rebuild_foreign_keys(table: Table, column: str, on_delete: str):
+    def step(connection: Connection) -> None:
+        old = f"{table.name}_old"
+        leftover = connection.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+            (old,)).first()
+        if leftover:
+            connection.exec_driver_sql(f"DROP TABLE IF EXISTS {table.name}")
+            connection.exec_driver_sql(
+                f"ALTER TABLE {old} RENAME TO {table.name}")
+        foreign_keys = connection.exec_driver_sql(
+            f"PRAGMA foreign_key_list({table.name})").all()
+        if all(row[6] == on_delete for row in foreign_keys
+               if row[3] == column):
+            return
+        connection.exec_driver_sql(
+            f"ALTER TABLE {table.name} RENAME TO {old}")
+        for index in table.indexes:
+            connection.exec_driver_sql(f"DROP INDEX IF EXISTS {index.name}")
+        table.create(connection)
+        columns = ", ".join(table.columns.keys())
+        # EXISTS correlacionado: com IN (SELECT ...), o planejador chegou a
+        # percorrer o produto das tabelas referenciadas.
+        references = " AND ".join(
+            f"EXISTS (SELECT 1 FROM {key.column.table.name} WHERE "
+            f"{key.column.table.name}.{key.column.name} = "
+            f"{old}.{key.parent.name})"
+            for key in table.foreign_keys)
+        connection.exec_driver_sql(
+            f"INSERT INTO {table.name} ({columns}) "
+            f"SELECT {columns} FROM {old} WHERE {references}")
+        connection.exec_driver_sql(f"DROP TABLE {old}")
+        # As estatísticas do planejador iam junto com a tabela antiga.
+        connection.exec_driver_sql(f"ANALYZE {table.name}")
+    return step
+
+
+STATISTIC_COLUMNS = (ProjectStatistic.__table__.c.changed_at,
+                     ProjectStatusStatistic.__table__.c.changed_at,
+                     ProjectStatistic.__table__.c.version,
+                     ProjectStatusStatistic.__table__.c.version)
+
+
+# Os triggers e o rebuild usam as colunas atuais dos contadores, que numa
+# base parada num passo antigo podem ainda não existir; por isso as colunas
+# vêm antes.
+def refresh_statistics(connection: Connection) -> None:
+    add_columns(*STATISTIC_COLUMNS)(connection)
+    create_statistics(connection)
+
+
+# Os passos pendentes rodam todos na mesma transação, então os triggers e
+# os contadores só precisam ser recriados uma vez, no último passo que os
+# altera: os anteriores apenas garantem as colunas. O rebuild percorre
+# task e assignment inteiras.
+MIGRATIONS = [
+    create_indexes("ix_task_project_id_status",
+                   "ix_project_status",
+                   "ix_assignment_collaborator_id_task_id"),
+    create_indexes("ix_project_created_at"),
+    create_search_index,
+    add_columns(*STATISTIC_COLUMNS),
+    add_columns(ProjectStatistic.__table__.c.changed_at,
+                ProjectStatusStatistic.__table__.c.changed_at),
+    add_columns(*STATISTIC_COLUMNS),
+    rebuild_foreign_keys(Assignment.__table__, "task_id", "CASCADE"),
+    add_columns(*STATISTIC_COLUMNS),
+    add_columns(ProjectStatistic.__table__.c.version,
+                ProjectStatusStatistic.__table__.c.version),
+    refresh_statistics,
+    drop_indexes("ix_task_project_id"),
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def schema_version(connection: Connection) -> int:
+    return connection.exec_driver_sql("PRAGMA user_version").scalar()
+
+
+# O pysqlite só abre transações antes de INSERT/UPDATE/DELETE: um CREATE,
+# ALTER ou PRAGMA user_version fora delas é gravado na hora e sobrevive a
+# um rollback. Aqui o driver deixa de controlar as transações
+# (isolation_level=None) e o BEGIN IMMEDIATE é explícito, então uma falha
+# em qualquer passo desfaz tudo, inclusive a versão.
+def migrate(engine: Engine) -> int:
+    with engine.connect() as connection:
+        dbapi_connection = connection.connection.dbapi_connection
+        isolation_level = dbapi_connection.isolation_level
+        dbapi_connection.isolation_level = None
+        try:
+            with connection.begin():
+                connection.exec_driver_sql("BEGIN IMMEDIATE")
+                version = schema_version(connection)
+                for number, step in enumerate(MIGRATIONS[version:],
+                                              start=version + 1):
+                    step(connection)
+                    connection.exec_driver_sql(
+                        f"PRAGMA user_version={number}")
+            return schema_version(connection)
+        finally:
+            dbapi_connection.isolation_level = isolation_level
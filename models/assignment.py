@@ -1,11 +1,15 @@
-from sqlmodel import SQLModel, Field
+from sqlmodel import SQLModel, Field, Index
 
 
 class Assignment(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_assignment_collaborator_id_task_id",
+              "collaborator_id", "task_id"),
+    )
+
     task_id: int = Field(
         default=None, foreign_key="task.id",
-        primary_key=True
-        )
+        primary_key=True, ondelete="CASCADE")
     collaborator_id: int = Field(
         default=None, foreign_key="collaborator.id",
         primary_key=True, ondelete="CASCADE")
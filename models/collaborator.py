@@ -18,5 +18,6 @@ class Collaborator(CollaboratorBase, table=True):
     tasks: list["Task"] = Relationship(
         back_populates="collaborators",
         link_model=Assignment,
-        sa_relationship_kwargs={"cascade": "save-update, merge"}
+        sa_relationship_kwargs={"cascade": "save-update, merge",
+                                "passive_deletes": True}
         )
@@ -10,14 +10,17 @@ class ProjectBase(SQLModel):
     name: str
     description: str
     created_at: datetime = Field(
-        default_factory=lambda: datetime.now(timezone.utc))
+        default_factory=lambda: datetime.now(timezone.utc), index=True)
     updated_at: datetime = Field(
         default_factory=lambda: datetime.now(timezone.utc))
-    status: StatusEnum = Field(default=StatusEnum.NOT_DONE)
+    status: StatusEnum = Field(default=StatusEnum.NOT_DONE, index=True)
 
 
+# passive_deletes: ao remover pelo ORM, as tarefas (e suas atribuições)
+# saem pelo ON DELETE CASCADE do banco, sem serem carregadas.
 class Project(ProjectBase, table=True):
     tasks: list["Task"] = Relationship(
         back_populates="project",
-        sa_relationship_kwargs={"cascade": "all, delete-orphan"}
+        sa_relationship_kwargs={"cascade": "all, delete-orphan",
+                                "passive_deletes": True}
         )
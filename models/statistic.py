@@ -0,0 +1,33 @@
+from datetime import datetime
+from sqlmodel import SQLModel, Field
+
+from .enum.status_enum import StatusEnum
+
+
+# Contadores mantidos por triggers (services/statistics.py) na mesma
+# transação das escritas em project, task e assignment. `version` cresce a
+# cada alteração (mesmo dentro do mesmo milissegundo de changed_at) e é a
+# base das ETags de api/conditional.py.
+class ProjectStatusStatistic(SQLModel, table=True):
+    status: StatusEnum = Field(primary_key=True)
+    total: int = 0
+    changed_at: datetime | None = None
+    version: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+
+
+class ProjectStatistic(SQLModel, table=True):
+    project_id: int = Field(foreign_key="project.id", primary_key=True,
+                            ondelete="CASCADE")
+    task_count: int = Field(default=0, index=True)
+    not_done_count: int = 0
+    doing_count: int = 0
+    done_count: int = 0
+    changed_at: datetime | None = None
+    version: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+
+
+class TaskStatistic(SQLModel, table=True):
+    task_id: int = Field(foreign_key="task.id", primary_key=True,
+                         ondelete="CASCADE")
+    project_id: int = Field(index=True)
+    collaborator_count: int = 0
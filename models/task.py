@@ -1,5 +1,5 @@
 from datetime import datetime, timezone
-from sqlmodel import SQLModel, Field, Relationship
+from sqlmodel import SQLModel, Field, Relationship, Index
 from typing import TYPE_CHECKING
 from .collaborator import Collaborator
 from .assignment import Assignment
@@ -21,6 +21,15 @@ class TaskBase(SQLModel):
 
 
 class Task(TaskBase, table=True):
+    # O índice composto também atende às buscas só por project_id (prefixo
+    # à esquerda); um índice só de project_id dobraria o custo das escritas.
+    # Em troca, as listas de um projeto ordenadas por id ordenam as tarefas
+    # do projeto num B-tree temporário, barato para projetos de tamanho
+    # comum.
+    __table_args__ = (
+        Index("ix_task_project_id_status", "project_id", "status"),
+    )
+
     project_id: int = Field(foreign_key="project.id", ondelete="CASCADE")
     project: "Project" = Relationship(
         back_populates="tasks"
@@ -28,5 +37,6 @@ class Task(TaskBase, table=True):
     collaborators: list["Collaborator"] = Relationship(
         back_populates="tasks",
         link_model=Assignment,
-        sa_relationship_kwargs={"cascade": "save-update, merge"}
+        sa_relationship_kwargs={"cascade": "save-update, merge",
+                                "passive_deletes": True}
         )
@@ -0,0 +1,45 @@
+# Importa um arquivo NDJSON ou CSV (ex.: gerado por /export) para a base.
+# Uso: python -m scripts.import_data tasks tasks.ndjson --chunk-size 5000
+# Importe na ordem projects, collaborators, tasks, assignments.
+import argparse
+import sys
+
+from database import create_db_and_tables, get_engine
+from services.importer import ENTITIES, import_file
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("entity", choices=ENTITIES)
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=("ndjson", "csv"),
+                        help="default: file extension")
+    parser.add_argument("--chunk-size", type=int, default=1000,
+                        help="rows per transaction (default: 1000)")
+    parser.add_argument("--drop-indexes", action="store_true",
+                        help="drop secondary indexes during the load and "
+                             "rebuild them at the end")
+    parser.add_argument("--checkpoint",
+                        help="resume file (default: <path>.checkpoint)")
+    args = parser.parse_args()
+
+    # Índices pendentes de uma carga interrompida ficam com o checkpoint.
+    create_db_and_tables(indexes=False)
+    try:
+        result = import_file(get_engine(), args.entity, args.path, args.format,
+                             args.chunk_size, args.drop_indexes,
+                             args.checkpoint)
+    except Exception as error:
+        # Erros do SQLAlchemy trazem o SQL e os parâmetros do bloco inteiro.
+        print(f"Import failed: {getattr(error, 'orig', error)}",
+              file=sys.stderr)
+        print("Run the same command again to resume from the last "
+              "committed chunk.", file=sys.stderr)
+        return 1
+    print(f"Imported {result.rows} {args.entity} in {result.seconds:.1f}s "
+          f"({result.rows_per_second:.0f} rows/s).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,14 @@
+# Cria as tabelas e aplica as migrações pendentes. Rode uma vez por
+# implantação, antes de subir os workers (que, com DB_AUTO_MIGRATE=0, só
+# conferem a versão).
+# Uso: python -m scripts.migrate
+from database import create_db_and_tables
+
+
+def main() -> None:
+    version = create_db_and_tables()
+    print(f"Schema at version {version}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,14 @@
+# Recalcula os contadores de estatística a partir das tabelas base.
+# Uso: python -m scripts.rebuild_statistics
+from database import get_engine
+from services.statistics import rebuild_statistics
+
+
+def main() -> None:
+    with get_engine().begin() as connection:
+        rebuild_statistics(connection)
+    print("Statistics rebuilt.")
+
+
+if __name__ == "__main__":
+    main()
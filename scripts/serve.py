@@ -0,0 +1,71 @@
+# Modo de produção: migra a base uma vez e sobe N workers do uvicorn sobre
+# o mesmo arquivo SQLite em WAL. Cada worker cria seus engines no primeiro
+# uso e, na subida, só confere a versão do esquema.
+# Uso: DATABASE_URL=sqlite:///prod.db python -m scripts.serve --workers 4
+#
+# O cache de respostas em memória e o feed de /events vivem no processo.
+# Com vários workers, um worker serviria corpos em cache (com ETag nova,
+# e depois 304) após escritas feitas em outro, e cada cliente de /events
+# veria só as escritas do seu worker. Por isso, com mais de um worker, os
+# dois são desligados: CACHE_BACKEND=none e CHANGEFEED=0.
+import argparse
+import os
+
+import uvicorn
+from dotenv import load_dotenv
+
+# Padrões do modo de produção; o que já estiver no ambiente ou no .env
+# prevalece.
+SERVE_DEFAULTS = {
+    # Leitores não bloqueiam o escritor; fsync só nos checkpoints.
+    "SQLITE_JOURNAL_MODE": "WAL",
+    "SQLITE_SYNCHRONOUS": "NORMAL",
+    # Os workers disputam o mesmo lock de escrita.
+    "SQLITE_BUSY_TIMEOUT": "10000",
+    # Leituras: páginas mapeadas em memória (compartilhadas entre os
+    # processos pelo cache do SO) e 32 MiB de cache por conexão.
+    "SQLITE_MMAP_SIZE": "268435456",
+    "SQLITE_CACHE_SIZE": "-32768",
+    # Por worker; a escrita é serializada no arquivo de qualquer forma.
+    "DB_POOL_SIZE": "4",
+    "DB_MAX_OVERFLOW": "4",
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--log-level", default="warning")
+    # Segundos de espera pelas requisições em andamento ao encerrar; os
+    # streams de /events não terminam sozinhos e são cancelados depois.
+    parser.add_argument("--graceful-timeout", type=int, default=5)
+    args = parser.parse_args()
+
+    load_dotenv()
+    for name, value in SERVE_DEFAULTS.items():
+        os.environ.setdefault(name, value)
+    # DDL só aqui, antes dos workers.
+    os.environ["DB_AUTO_MIGRATE"] = "0"
+    if args.workers > 1:
+        if os.environ.get("CACHE_BACKEND", "memory") != "none":
+            print("Several workers: disabling the in-process response "
+                  "cache (CACHE_BACKEND=none).")
+        if os.environ.get("CHANGEFEED", "1").lower() in ("1", "true"):
+            print("Several workers: disabling the in-process change feed "
+                  "(CHANGEFEED=0, no /events).")
+        os.environ["CACHE_BACKEND"] = "none"
+        os.environ["CHANGEFEED"] = "0"
+
+    from database import create_db_and_tables, get_engine
+    version = create_db_and_tables()
+    get_engine().dispose()
+    print(f"Schema at version {version}; starting {args.workers} workers.")
+    uvicorn.run("main:app", host=args.host, port=args.port,
+                workers=args.workers, log_level=args.log_level,
+                timeout_graceful_shutdown=args.graceful_timeout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+import functools
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Any, Callable, Iterable
+
+import orjson
+from fastapi import Response
+from pydantic import TypeAdapter
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+CACHE_TTL = float(os.getenv("CACHE_TTL", "60"))
+
+# Versão do recurso lida do banco nesta requisição (a ETag calculada por
+# api/conditional.py). Entra na chave do cache: uma escrita que não passou
+# por invalidate(), feita por outro worker ou por um script, muda a versão
+# e o corpo velho deixa de ser servido.
+cache_version: ContextVar[str | None] = ContextVar("cache_version",
+                                                   default=None)
+
+
+class CacheBackend(ABC):
+    # Interface assíncrona para que um backend compartilhado (ex.: Redis,
+    # para vários workers) possa substituir o cache em memória.
+    @abstractmethod
+    async def get(self, key: str) -> bytes | None: ...
+
+    # `generation` é o valor de `generation()` lido antes de montar o valor;
+    # se houve invalidação desde então, o valor pode estar velho e é
+    # descartado.
+    @abstractmethod
+    async def set(self, key: str, value: bytes, tags: Iterable[str],
+                  generation: int) -> None: ...
+
+    @abstractmethod
+    async def invalidate(self, *tags: str) -> None: ...
+
+    @abstractmethod
+    async def generation(self) -> int: ...
+
+    @abstractmethod
+    def stats(self) -> dict[str, int]: ...
+
+
+class MemoryCache(CacheBackend):
+    # LRU limitado por número de entradas, com TTL por entrada e um índice
+    # de tags -> chaves para invalidação precisa.
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES,
+                 ttl: float = CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries: OrderedDict[str, tuple[float, bytes, tuple]] = (
+            OrderedDict())
+        self.tags: dict[str, set[str]] = {}
+        self.current_generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    async def get(self, key: str) -> bytes | None:
+        entry = self.entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    async def set(self, key: str, value: bytes, tags: Iterable[str],
+                  generation: int) -> None:
+        if generation != self.current_generation:
+            return
+        if key in self.entries:
+            self._remove(key)
+        tags = tuple(tags)
+        self.entries[key] = (time.monotonic() + self.ttl, value, tags)
+        for tag in tags:
+            self.tags.setdefault(tag, set()).add(key)
+        while len(self.entries) > self.max_entries:
+            self._remove(next(iter(self.entries)))
+            self.evictions += 1
+
+    async def invalidate(self, *tags: str) -> None:
+        self.current_generation += 1
+        for tag in tags:
+            for key in self.tags.pop(tag, ()):
+                self._remove(key)
+
+    async def generation(self) -> int:
+        return self.current_generation
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self.entries),
+        }
+
+    def _remove(self, key: str) -> None:
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self.tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.tags[tag]
+
+
+class NullCache(CacheBackend):
+    def __init__(self):
+        self.misses = 0
+
+    async def get(self, key: str) -> bytes | None:
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: bytes, tags: Iterable[str],
+                  generation: int) -> None:
+        pass
+
+    async def invalidate(self, *tags: str) -> None:
+        pass
+
+    async def generation(self) -> int:
+        return 0
+
+    def stats(self) -> dict[str, int]:
+        return {"hits": 0, "misses": self.misses, "evictions": 0,
+                "entries": 0}
+
+
+BACKENDS = {"memory": MemoryCache, "none": NullCache}
+
+cache: CacheBackend = BACKENDS[CACHE_BACKEND]()
+
+
+async def invalidate(*tags: str) -> None:
+    await cache.invalidate(*tags)
+
+
+def cached(model, tags: Callable[[dict, Any], Iterable[str]]):
+    # Cache de leitura para rotas GET: a chave é o nome da rota mais os
+    # parâmetros simples (path/query); o valor é o JSON já serializado pelo
+    # response_model. Só respostas 200 são guardadas. `tags(params, content)`
+    # devolve as tags que os handlers de escrita usam para invalidar. Com
+    # cache_version definida, a chave inclui a versão.
+    adapter = TypeAdapter(model)
+
+    def decorator(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(**kwargs):
+            params = {name: value for name, value in kwargs.items()
+                      if isinstance(value, (str, int, float, bool))
+                      or value is None}
+            key = f"{endpoint.__module__}.{endpoint.__name__}:" + ",".join(
+                f"{name}={params[name]}" for name in sorted(params))
+            version = cache_version.get()
+            if version is not None:
+                key += f"@{version}"
+            body = await cache.get(key)
+            if body is None:
+                generation = await cache.generation()
+                result = await endpoint(**kwargs)
+                if isinstance(result, Response):
+                    if result.status_code != 200:
+                        return result
+                    body = bytes(result.body)
+                    content = orjson.loads(body)
+                else:
+                    value = adapter.validate_python(result,
+                                                    from_attributes=True)
+                    body = adapter.dump_json(value)
+                    content = adapter.dump_python(value, mode="json")
+                await cache.set(key, body, tags(params, content), generation)
+            return Response(content=body, media_type="application/json")
+        return wrapper
+    return decorator
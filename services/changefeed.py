@@ -0,0 +1,171 @@
+import asyncio
+import os
+import secrets
+from collections import deque
+from itertools import islice
+from typing import AsyncIterator
+
+import orjson
+
+# Feed de mudanças para dashboards (Server-Sent Events em /events): os
+# handlers de escrita publicam um evento compacto por entidade alterada,
+# depois do commit, e cada cliente recebe os que casam com o seu filtro.
+# O feed vive no processo: com vários workers, cada um teria o seu, e por
+# isso scripts/serve.py o desliga (CHANGEFEED=0) quando há mais de um.
+CHANGEFEED = os.getenv("CHANGEFEED", "1").lower() in ("1", "true")
+CHANGEFEED_BUFFER = int(os.getenv("CHANGEFEED_BUFFER", "1024"))
+CHANGEFEED_QUEUE_SIZE = int(os.getenv("CHANGEFEED_QUEUE_SIZE", "256"))
+CHANGEFEED_HEARTBEAT = float(os.getenv("CHANGEFEED_HEARTBEAT", "15"))
+
+ENTITIES = ("project", "task", "collaborator", "assignment")
+
+
+class Subscription:
+    def __init__(self, entities: tuple[str, ...] | None,
+                 project_id: int | None, queue_size: int):
+        self.entities = entities
+        self.project_id = project_id
+        self.queue: asyncio.Queue = asyncio.Queue(queue_size)
+        # Fila cheia: o cliente deixa de receber eventos na fila e, ao
+        # esvaziá-la, é atualizado a partir do buffer, de forma agregada.
+        self.lagging = False
+
+    def matches(self, change: dict) -> bool:
+        if self.entities is not None and change["entity"] not in self.entities:
+            return False
+        return self.project_id is None or self.project_id in (
+            change.get("project_id"), change.get("previous_project_id"))
+
+
+# Uma tarefa movida continua visível para quem acompanha o projeto antigo;
+# uma atribuição é identificada pelo par (tarefa, colaborador).
+def _change_key(change: dict) -> tuple:
+    return change["entity"], change["id"], change.get("collaborator_id")
+
+
+# Só o último evento de cada entidade, na ordem em que ocorreram.
+def _coalesce(events: list) -> list:
+    latest = {}
+    for event in events:
+        key = _change_key(event[1])
+        latest.pop(key, None)
+        latest[key] = event
+    return list(latest.values())
+
+
+class ChangeFeed:
+    # Os eventos recentes ficam num buffer circular, de onde saem a retomada
+    # por Last-Event-ID e a atualização dos clientes atrasados. Os ids são
+    # "<época>-<sequência>": a época muda a cada processo, e um id de outra
+    # época (ou já fora do buffer) leva a um evento `reset`, para o cliente
+    # recarregar os dados.
+    def __init__(self, buffer_size: int, queue_size: int):
+        self.epoch = secrets.token_hex(4)
+        self.seq = 0
+        self.buffer: deque = deque(maxlen=buffer_size)
+        self.queue_size = queue_size
+        self.subscriptions: set[Subscription] = set()
+
+    def event_id(self, seq: int) -> str:
+        return f"{self.epoch}-{seq}"
+
+    def parse_event_id(self, event_id: str | None) -> int | None:
+        epoch, _, seq = (event_id or "").partition("-")
+        if epoch != self.epoch or not seq.isdigit() or int(seq) > self.seq:
+            return None
+        return int(seq)
+
+    # O quadro SSE é montado uma vez e compartilhado por todos os clientes;
+    # publicar custa um put_nowait por assinatura que casa com o evento.
+    def publish(self, change: dict) -> None:
+        self.seq += 1
+        frame = b"".join((b"id: ", self.event_id(self.seq).encode(),
+                          b"\ndata: ", orjson.dumps(change), b"\n\n"))
+        event = (self.seq, change, frame)
+        self.buffer.append(event)
+        for subscription in self.subscriptions:
+            if subscription.lagging or not subscription.matches(change):
+                continue
+            try:
+                subscription.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                subscription.lagging = True
+
+    # Eventos posteriores a `seq` que casam com a assinatura, ou None se
+    # parte deles já saiu do buffer.
+    def since(self, subscription: Subscription, seq: int) -> list | None:
+        if seq == self.seq:
+            return []
+        if not self.buffer or self.buffer[0][0] > seq + 1:
+            return None
+        start = seq + 1 - self.buffer[0][0]
+        return [event for event in islice(self.buffer, start, None)
+                if subscription.matches(event[1])]
+
+    def reset_frame(self) -> bytes:
+        return (f"id: {self.event_id(self.seq)}\nevent: reset\ndata: {{}}"
+                "\n\n").encode()
+
+    async def stream(self, subscription: Subscription,
+                     last_event_id: str | None,
+                     heartbeat: float) -> AsyncIterator[bytes]:
+        # A assinatura e a leitura do buffer acontecem sem await entre
+        # elas: nenhum evento fica de fora nem chega duas vezes.
+        self.subscriptions.add(subscription)
+        delivered = self.seq
+        try:
+            if last_event_id is not None:
+                seq = self.parse_event_id(last_event_id)
+                replay = None if seq is None else self.since(subscription,
+                                                             seq)
+                if replay is None:
+                    yield self.reset_frame()
+                else:
+                    for event in replay:
+                        yield event[2]
+            while True:
+                if subscription.lagging and subscription.queue.empty():
+                    subscription.lagging = False
+                    missed = self.since(subscription, delivered)
+                    if missed is None:
+                        delivered = self.seq
+                        yield self.reset_frame()
+                        continue
+                    for event in _coalesce(missed):
+                        yield event[2]
+                    delivered = self.seq
+                    continue
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(),
+                                                   heartbeat)
+                except TimeoutError:
+                    yield b": keep-alive\n\n"
+                    continue
+                if event[0] > delivered:
+                    delivered = event[0]
+                    yield event[2]
+        finally:
+            self.subscriptions.discard(subscription)
+
+    def subscribe(self, entities: tuple[str, ...] | None,
+                  project_id: int | None) -> Subscription:
+        return Subscription(entities, project_id, self.queue_size)
+
+    def stats(self) -> dict[str, int]:
+        return {"subscribers": len(self.subscriptions),
+                "lagging": sum(subscription.lagging
+                               for subscription in self.subscriptions),
+                "last_event": self.seq, "buffered": len(self.buffer)}
+
+
+feed = ChangeFeed(CHANGEFEED_BUFFER, CHANGEFEED_QUEUE_SIZE)
+
+
+# Chamado pelos handlers de escrita depois do commit, junto de invalidate().
+# `fields` traz o contexto usado nos filtros, como project_id.
+def publish(entity: str, entity_id: int, operation: str, status=None,
+            **fields) -> None:
+    if not CHANGEFEED:
+        return
+    feed.publish({"entity": entity, "id": entity_id, "op": operation,
+                  "status": status, **fields})
@@ -0,0 +1,147 @@
+import csv
+import json
+import os
+import time
+from dataclasses import dataclass
+from itertools import islice
+from typing import Callable, Iterator
+
+from pydantic import BaseModel
+from sqlalchemy import Engine, Table, insert
+
+from dto.bulk_dto import AssignmentBulkItem, TaskBulkItem
+from models.assignment import Assignment
+from models.collaborator import Collaborator, CollaboratorBase
+from models.project import Project, ProjectBase
+from models.task import Task
+
+# Tabela de destino e o modelo que valida/converte cada linha (datas em
+# texto, status pelo valor, etc.). Os ids do arquivo são mantidos, para que
+# as referências entre arquivos continuem válidas; sem id, o SQLite gera.
+ENTITIES: dict[str, tuple[Table, type[BaseModel]]] = {
+    "projects": (Project.__table__, ProjectBase),
+    "tasks": (Task.__table__, TaskBulkItem),
+    "collaborators": (Collaborator.__table__, CollaboratorBase),
+    "assignments": (Assignment.__table__, AssignmentBulkItem),
+}
+
+
+@dataclass
+class ImportResult:
+    rows: int = 0
+    skipped: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+# Lê o arquivo linha a linha; o formato vem da extensão (.ndjson/.jsonl ou
+# .csv). No CSV, campos vazios ficam de fora para valerem os padrões.
+def read_rows(path: str, format: str | None = None) -> Iterator[dict]:
+    format = format or os.path.splitext(path)[1].lstrip(".").lower()
+    with open(path, newline="", encoding="utf-8") as file:
+        if format == "csv":
+            for row in csv.DictReader(file):
+                yield {key: value for key, value in row.items()
+                       if value != ""}
+        elif format in ("ndjson", "jsonl", "json"):
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            raise ValueError(f"Unknown format '{format}'.")
+
+
+def _chunks(rows: Iterator[dict], size: int) -> Iterator[list[dict]]:
+    while chunk := list(islice(rows, size)):
+        yield chunk
+
+
+# O checkpoint guarda quantas linhas do arquivo já foram confirmadas e os
+# índices removidos por --drop-indexes que ainda não foram recriados; numa
+# nova execução as linhas são puladas e a carga recomeça no bloco que falhou.
+def _read_checkpoint(path: str) -> dict:
+    if not os.path.exists(path):
+        return {"rows": 0, "indexes": []}
+    with open(path, encoding="utf-8") as file:
+        return {"indexes": [], **json.load(file)}
+
+
+def _write_checkpoint(path: str, rows: int, indexes: list[str]) -> None:
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump({"rows": rows, "indexes": indexes}, file)
+
+
+# Índices secundários não únicos: os únicos (ex.: e-mail do colaborador)
+# ficam, pois garantem a integridade durante a carga.
+def _secondary_indexes(table: Table) -> list:
+    return [index for index in table.indexes if not index.unique]
+
+
+def _create_indexes(engine: Engine, indexes: list,
+                    report: Callable[[str], None]) -> None:
+    report("Rebuilding indexes...")
+    with engine.begin() as connection:
+        for index in indexes:
+            index.create(connection, checkfirst=True)
+
+
+def import_file(engine: Engine, entity: str, path: str,
+                format: str | None = None, chunk_size: int = 1000,
+                drop_indexes: bool = False, checkpoint: str | None = None,
+                report: Callable[[str], None] = print) -> ImportResult:
+    table, model = ENTITIES[entity]
+    checkpoint = checkpoint or f"{path}.checkpoint"
+    state = _read_checkpoint(checkpoint)
+    result = ImportResult(skipped=state["rows"])
+    rows = islice(read_rows(path, format), result.skipped, None)
+    statement = insert(table)
+    if result.skipped:
+        report(f"Resuming after row {result.skipped}.")
+
+    # Uma execução interrompida sem passar pelo finally (ex.: SIGKILL)
+    # deixa os índices que removeu no checkpoint. Sem --drop-indexes, eles
+    # são recriados antes da carga; com ele, no fim, junto dos demais. O
+    # scripts.migrate (create_db_and_tables) também recria os que faltarem.
+    pending = [index for index in table.indexes
+               if index.name in state["indexes"]]
+    if pending and not drop_indexes:
+        _create_indexes(engine, pending, report)
+        _write_checkpoint(checkpoint, result.skipped, [])
+    indexes = _secondary_indexes(table) if drop_indexes else []
+    dropped = [index.name for index in indexes]
+    if indexes:
+        # Registrados antes do DROP, para nunca se perderem.
+        _write_checkpoint(checkpoint, result.skipped, dropped)
+        with engine.begin() as connection:
+            for index in indexes:
+                index.drop(connection, checkfirst=True)
+    start = time.perf_counter()
+    try:
+        for chunk in _chunks(rows, chunk_size):
+            values = [model.model_validate(row).model_dump()
+                      for row in chunk]
+            # Cada bloco é uma transação; as chaves estrangeiras só são
+            # verificadas no commit, permitindo linhas fora de ordem no
+            # mesmo bloco.
+            with engine.begin() as connection:
+                connection.exec_driver_sql("PRAGMA defer_foreign_keys=ON")
+                connection.execute(statement, values)
+            result.rows += len(values)
+            result.seconds = time.perf_counter() - start
+            _write_checkpoint(checkpoint, result.skipped + result.rows,
+                              dropped)
+            report(f"{entity}: {result.skipped + result.rows} rows "
+                   f"({result.rows_per_second:.0f} rows/s)")
+    finally:
+        if indexes:
+            _create_indexes(engine, indexes, report)
+            if os.path.exists(checkpoint):
+                _write_checkpoint(checkpoint, result.skipped + result.rows,
+                                  [])
+    result.seconds = time.perf_counter() - start
+    if os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    return result
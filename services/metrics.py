@@ -0,0 +1,258 @@
+import os
+import sqlite3
+import time
+from bisect import bisect_left
+
+from sqlalchemy import Engine, event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+
+METRICS = os.getenv("METRICS", "1").lower() in ("1", "true")
+
+# Limites superiores (segundos) dos buckets; a contagem de cada bucket é
+# alocada uma vez, na criação do histograma.
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                   10.0)
+STATEMENT_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                     0.05, 0.1, 0.25, 1.0)
+CHECKOUT_BUCKETS = (0.0001, 0.001, 0.01, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    def render(self, name: str, labels: str) -> list[str]:
+        separator = "," if labels else ""
+        lines = []
+        total = 0
+        for bound, count in zip((*self.bounds, "+Inf"), self.counts):
+            total += count
+            lines.append(f'{name}_bucket{{{labels}{separator}le="{bound}"}} '
+                         f'{total}')
+        suffix = f"{{{labels}}}" if labels else ""
+        lines.append(f"{name}_sum{suffix} {self.sum}")
+        lines.append(f"{name}_count{suffix} {total}")
+        return lines
+
+
+class RouteMetrics:
+    __slots__ = ("latency", "statuses")
+
+    def __init__(self):
+        self.latency = Histogram(REQUEST_BUCKETS)
+        self.statuses: dict[int, int] = {}
+
+
+# Métricas por rota: {template da rota: {método: RouteMetrics}}. O template
+# (ex.: /projects/{project_id}) limita a cardinalidade; requisições sem rota
+# caem em "unmatched".
+routes: dict[str, dict[str, RouteMetrics]] = {}
+in_flight = 0
+
+statements = Histogram(STATEMENT_BUCKETS)
+pools: dict[str, dict] = {}
+sqlite_busy = 0
+
+
+def route_metrics(path: str, method: str) -> RouteMetrics:
+    methods = routes.get(path)
+    if methods is None:
+        methods = routes[path] = {}
+    metrics = methods.get(method)
+    if metrics is None:
+        metrics = methods[method] = RouteMetrics()
+    return metrics
+
+
+class MetricsMiddleware:
+    # Middleware ASGI: latência e status por rota e requisições em curso.
+    # O tempo vai até o fim do corpo, inclusive em respostas em streaming.
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        global in_flight
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_flight += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            in_flight -= 1
+            route = scope.get("route")
+            metrics = route_metrics(getattr(route, "path", "unmatched"),
+                                    scope["method"])
+            metrics.latency.observe(time.perf_counter() - start)
+            metrics.statuses[status_code] = \
+                metrics.statuses.get(status_code, 0) + 1
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context,
+                          executemany):
+    conn.info.setdefault("metrics_start", []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context,
+                         executemany):
+    if conn.info.get("metrics_start"):
+        statements.observe(time.perf_counter() - conn.info["metrics_start"]
+                           .pop())
+
+
+# Erros "database is locked"/"busy": o SQLite já tentou de novo por
+# busy_timeout e desistiu.
+def handle_error(context):
+    global sqlite_busy
+    error = context.original_exception
+    if isinstance(error, sqlite3.OperationalError) and \
+            ("locked" in str(error) or "busy" in str(error)):
+        sqlite_busy += 1
+
+
+# O pool não tem evento antes da espera por uma conexão livre. Estas
+# subclasses, passadas como poolclass= pelo database.py, cronometram a
+# obtenção em _do_get, o método que as subclasses de Pool implementam. Os
+# contadores são atribuídos por instrument() e seguem para o pool que
+# dispose() cria no lugar deste (recreate).
+class TimedPool:
+    checkout_metrics: dict | None = None
+
+    def _do_get(self):
+        counters = self.checkout_metrics
+        if counters is None:
+            return super()._do_get()
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            counters["timeouts"] += 1
+            raise
+        finally:
+            counters["wait"].observe(time.perf_counter() - start)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.checkout_metrics = self.checkout_metrics
+        return pool
+
+
+class TimedQueuePool(TimedPool, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(TimedPool, AsyncAdaptedQueuePool):
+    pass
+
+
+def instrument(engine: Engine, name: str) -> None:
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+    event.listen(engine, "handle_error", handle_error)
+
+    counters = pools[name] = {"engine": engine, "checkouts": 0,
+                              "connects": 0, "timeouts": 0,
+                              "wait": Histogram(CHECKOUT_BUCKETS)}
+
+    # Os listeners do pool são copiados quando dispose() o recria.
+    @event.listens_for(engine.pool, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        counters["checkouts"] += 1
+
+    @event.listens_for(engine.pool, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        counters["connects"] += 1
+
+    # Bancos em memória usam pools de conexão única, sem espera a medir.
+    if isinstance(engine.pool, TimedPool):
+        engine.pool.checkout_metrics = counters
+
+
+def _pool_gauge(pool, method: str) -> int:
+    # Pools sem dimensionamento (ex.: banco em memória) não expõem todos.
+    return getattr(pool, method)() if hasattr(pool, method) else 0
+
+
+def render() -> str:
+    lines = [
+        "# HELP http_requests_in_flight Requests being served.",
+        "# TYPE http_requests_in_flight gauge",
+        f"http_requests_in_flight {in_flight}",
+        "# HELP http_requests_total Requests by route, method and status.",
+        "# TYPE http_requests_total counter",
+    ]
+    for path, methods in routes.items():
+        for method, metrics in methods.items():
+            for status_code, count in metrics.statuses.items():
+                lines.append(f'http_requests_total{{route="{path}",'
+                             f'method="{method}",status="{status_code}"}} '
+                             f'{count}')
+    lines += ["# HELP http_request_duration_seconds Request latency.",
+              "# TYPE http_request_duration_seconds histogram"]
+    for path, methods in routes.items():
+        for method, metrics in methods.items():
+            lines += metrics.latency.render(
+                "http_request_duration_seconds",
+                f'route="{path}",method="{method}"')
+    lines += ["# HELP db_statement_duration_seconds SQL statement latency.",
+              "# TYPE db_statement_duration_seconds histogram",
+              *statements.render("db_statement_duration_seconds", ""),
+              "# HELP db_sqlite_busy_total Statements that failed with "
+              "database locked/busy after busy_timeout.",
+              "# TYPE db_sqlite_busy_total counter",
+              f"db_sqlite_busy_total {sqlite_busy}"]
+    for metric, kind, help in (
+            ("db_pool_checkouts_total", "counter", "Connection checkouts."),
+            ("db_pool_connections_created_total", "counter",
+             "New DBAPI connections."),
+            ("db_pool_timeouts_total", "counter",
+             "Checkouts that gave up after pool_timeout."),
+            ("db_pool_size", "gauge", "Configured pool size."),
+            ("db_pool_checked_out", "gauge", "Connections in use."),
+            ("db_pool_overflow", "gauge",
+             "Connections beyond pool_size (negative: unused slots)."),
+            ("db_pool_checkout_wait_seconds", "histogram",
+             "Time to obtain a connection from the pool.")):
+        lines += [f"# HELP {metric} {help}", f"# TYPE {metric} {kind}"]
+        for name, counters in pools.items():
+            pool = counters["engine"].pool
+            label = f'engine="{name}"'
+            value = {
+                "db_pool_checkouts_total": counters["checkouts"],
+                "db_pool_connections_created_total": counters["connects"],
+                "db_pool_timeouts_total": counters["timeouts"],
+                "db_pool_size": _pool_gauge(pool, "size"),
+                "db_pool_checked_out": _pool_gauge(pool, "checkedout"),
+                "db_pool_overflow": _pool_gauge(pool, "overflow"),
+            }.get(metric)
+            if value is None:
+                lines += counters["wait"].render(metric, label)
+            else:
+                lines.append(f"{metric}{{{label}}} {value}")
+    return "\n".join(lines) + "\n"
+
+
+async def metrics_endpoint(request: Request) -> PlainTextResponse:
+    return PlainTextResponse(render(),
+                             media_type="text/plain; version=0.0.4")
@@ -0,0 +1,183 @@
+import json
+import logging
+import os
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from sqlalchemy import event, Engine
+
+DB_PROFILE = os.getenv("DB_PROFILE", "0").lower() in ("1", "true")
+DB_PROFILE_LOG = os.getenv("DB_PROFILE_LOG", "0").lower() in ("1", "true")
+# off: não verifica; warn: registra um aviso; raise: levanta
+# QueryBudgetExceeded ao fim da requisição (para testes).
+DB_QUERY_BUDGET_MODE = os.getenv("DB_QUERY_BUDGET_MODE", "off").lower()
+# Execuções da mesma instrução numa requisição a partir das quais ela é
+# tratada como N+1.
+DB_N_PLUS_ONE_THRESHOLD = int(os.getenv("DB_N_PLUS_ONE_THRESHOLD", "5"))
+
+logger = logging.getLogger("db.profiler")
+
+
+# Listas expandidas de IN ("(?, ?, ?)") têm tamanhos diferentes a cada
+# chamada, mas são a mesma consulta.
+IN_LIST = re.compile(r"\(\?(?:, \?)*\)")
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+@dataclass
+class QueryProfile:
+    count: int = 0
+    total_time: float = 0.0
+    slowest_time: float = 0.0
+    slowest_statement: str | None = None
+    shapes: Counter = field(default_factory=Counter)
+    last_context: object = None
+
+    def record(self, statement: str, elapsed: float,
+               context: object = None) -> None:
+        self.total_time += elapsed
+        # Um executemany grande é enviado em lotes (INSERT de várias linhas)
+        # que compartilham o mesmo contexto de execução: contam como uma
+        # instrução só.
+        if context is None or context is not self.last_context:
+            self.count += 1
+            self.shapes[IN_LIST.sub("(?)", statement)] += 1
+        self.last_context = context
+        if elapsed > self.slowest_time:
+            self.slowest_time = elapsed
+            self.slowest_statement = statement
+
+    @property
+    def repeated(self) -> int:
+        return max(self.shapes.values(), default=0)
+
+    def n_plus_one(self, threshold: int = DB_N_PLUS_ONE_THRESHOLD
+                   ) -> dict[str, int]:
+        return {statement: count for statement, count in self.shapes.items()
+                if count >= threshold}
+
+
+# Teto de consultas de uma rota, verificado pelo middleware. Aplicado
+# logo abaixo do decorator de rota:
+#
+#     @router.get("/{project_id}")
+#     @query_budget(1)
+#     async def find_project_by_id(...):
+def query_budget(limit: int):
+    def decorator(endpoint):
+        endpoint.query_budget = limit
+        return endpoint
+    return decorator
+
+
+# Perfil da requisição atual; None quando o profiler está desligado.
+current_profile: ContextVar[QueryProfile | None] = ContextVar(
+    "current_profile", default=None)
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context,
+                          executemany):
+    if current_profile.get() is not None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context,
+                         executemany):
+    profile = current_profile.get()
+    if profile is not None and conn.info.get("query_start"):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        profile.record(statement, elapsed, context)
+
+
+def instrument(engine: Engine) -> None:
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+
+
+def check_budget(scope, profile: QueryProfile,
+                 mode: str = DB_QUERY_BUDGET_MODE) -> None:
+    if mode == "off":
+        return
+    # O roteador do FastAPI grava a rota escolhida no próprio scope.
+    endpoint = getattr(scope.get("route"), "endpoint", None)
+    budget = getattr(endpoint, "query_budget", None)
+    problems = []
+    if budget is not None and profile.count > budget:
+        problems.append(f"{profile.count} queries, budget is {budget}")
+    for statement, count in profile.n_plus_one().items():
+        problems.append(f"possible N+1: {count}x "
+                        f"{' '.join(statement.split())[:200]}")
+    if not problems:
+        return
+    message = f"{scope['method']} {scope['path']}: " + "; ".join(problems)
+    if mode == "raise":
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
+
+
+class QueryProfilerMiddleware:
+    # Middleware ASGI: acrescenta X-DB-Queries, X-DB-Time-ms,
+    # X-DB-Slowest-ms e X-DB-Repeated (maior número de execuções de uma
+    # mesma instrução) à resposta, verifica o orçamento de consultas da rota
+    # e, opcionalmente, registra uma linha JSON.
+    #
+    # Numa resposta em streaming (ex.: /export), as consultas do corpo rodam
+    # depois que os cabeçalhos saíram: ela vai sem os X-DB-*, e a contagem
+    # final, verificada contra o orçamento depois do último pedaço do corpo,
+    # é sempre registrada no log. Respostas em streaming são as que saem sem
+    # Content-Length (exceto 204 e 304, que não têm corpo).
+    def __init__(self, app, log: bool = DB_PROFILE_LOG,
+                 budget_mode: str = DB_QUERY_BUDGET_MODE):
+        self.app = app
+        self.log = log
+        self.budget_mode = budget_mode
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = QueryProfile()
+        token = current_profile.set(profile)
+        streamed = False
+
+        async def send_with_headers(message):
+            nonlocal streamed
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                streamed = message["status"] not in (204, 304) and not any(
+                    name.lower() == b"content-length" for name, _ in headers)
+                if not streamed:
+                    headers += [
+                        (b"x-db-queries", str(profile.count).encode()),
+                        (b"x-db-time-ms",
+                         f"{profile.total_time * 1000:.2f}".encode()),
+                        (b"x-db-slowest-ms",
+                         f"{profile.slowest_time * 1000:.2f}".encode()),
+                        (b"x-db-repeated", str(profile.repeated).encode()),
+                    ]
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+            check_budget(scope, profile, self.budget_mode)
+        finally:
+            current_profile.reset(token)
+            if self.log or streamed:
+                logger.info(json.dumps({
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "queries": profile.count,
+                    "db_time_ms": round(profile.total_time * 1000, 2),
+                    "slowest_ms": round(profile.slowest_time * 1000, 2),
+                    "slowest_statement": profile.slowest_statement,
+                    "repeated": profile.repeated,
+                    "streamed": streamed,
+                }))
@@ -0,0 +1,78 @@
+import re
+
+from sqlalchemy import Connection, Select, column, false, literal_column, table
+
+# Tabelas FTS5 de conteúdo externo: o texto fica só na tabela base e o
+# índice é mantido por triggers de insert, update e delete.
+SEARCH_COLUMNS = {
+    "project": ("name", "description"),
+    "task": ("name", "description"),
+    "collaborator": ("name", "email"),
+}
+
+TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def fts_table(name: str):
+    return table(f"{name}_fts", column("rowid"), column("rank"))
+
+
+def fts_query(term: str, columns: tuple[str, ...] = ()) -> str | None:
+    # Cada palavra vira um prefixo entre aspas ("alp"*), o que neutraliza a
+    # sintaxe do FTS5 no texto digitado pelo usuário.
+    tokens = TOKEN.findall(term)
+    if not tokens:
+        return None
+    query = " ".join(f'"{token}"*' for token in tokens)
+    if columns:
+        query = "{" + " ".join(columns) + "} : (" + query + ")"
+    return query
+
+
+def search(statement: Select, model, term: str,
+           columns: tuple[str, ...] = (), ranked: bool = True) -> Select:
+    # Restringe o statement às linhas de `model` que casam com `term`,
+    # ordenadas por relevância (bm25) quando `ranked`.
+    query = fts_query(term, columns)
+    if query is None:
+        return statement.where(false())
+    fts = fts_table(model.__tablename__)
+    statement = (statement
+                 .join(fts, fts.c.rowid == model.id)
+                 .where(literal_column(fts.name).op("MATCH")(query)))
+    if ranked:
+        statement = statement.order_by(fts.c.rank)
+    return statement
+
+
+def create_search_index(connection: Connection) -> None:
+    for name, columns in SEARCH_COLUMNS.items():
+        fts = f"{name}_fts"
+        fields = ", ".join(columns)
+        new_values = ", ".join(f"new.{field}" for field in columns)
+        old_values = ", ".join(f"old.{field}" for field in columns)
+        statements = [
+            f"""CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+                {fields}, content='{name}', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2', prefix='2 3')""",
+            f"""CREATE TRIGGER IF NOT EXISTS {fts}_insert
+                AFTER INSERT ON {name} BEGIN
+                INSERT INTO {fts}(rowid, {fields})
+                VALUES (new.id, {new_values});
+                END""",
+            f"""CREATE TRIGGER IF NOT EXISTS {fts}_delete
+                AFTER DELETE ON {name} BEGIN
+                INSERT INTO {fts}({fts}, rowid, {fields})
+                VALUES ('delete', old.id, {old_values});
+                END""",
+            f"""CREATE TRIGGER IF NOT EXISTS {fts}_update
+                AFTER UPDATE OF {fields} ON {name} BEGIN
+                INSERT INTO {fts}({fts}, rowid, {fields})
+                VALUES ('delete', old.id, {old_values});
+                INSERT INTO {fts}(rowid, {fields})
+                VALUES (new.id, {new_values});
+                END""",
+            f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+        ]
+        for statement in statements:
+            connection.exec_driver_sql(statement)
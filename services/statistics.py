@@ -0,0 +1,145 @@
+from sqlalchemy import Connection
+
+from models.enum.status_enum import StatusEnum
+
+# O status é gravado pelo nome do enum (NOT_DONE, DOING, DONE); cada um tem
+# uma coluna <nome>_count em projectstatistic.
+STATUS_COLUMNS = {member.name: f"{member.name.lower()}_count"
+                  for member in StatusEnum}
+
+# Instante da última alteração, no mesmo formato em que o SQLAlchemy grava
+# datetimes (microssegundos), para servir de Last-Modified. A ETag usa
+# `version`, incrementada junto: duas escritas no mesmo milissegundo têm o
+# mesmo changed_at, mas versões diferentes.
+NOW = "strftime('%Y-%m-%d %H:%M:%f000', 'now')"
+TOUCH = f"changed_at = {NOW}, version = version + 1"
+
+
+def _task_delta(row: str, sign: str) -> str:
+    # Ex.: "task_count = task_count + 1, doing_count = doing_count +
+    # (NEW.status = 'DOING'), ..."
+    parts = [f"task_count = task_count {sign} 1"]
+    parts += [f"{column} = {column} {sign} ({row}.status = '{name}')"
+              for name, column in STATUS_COLUMNS.items()]
+    parts.append(TOUCH)
+    return ", ".join(parts)
+
+
+# projectstatistic.changed_at/version mudam a cada escrita no projeto ou em
+# suas tarefas (inclusive remoções); os de projectstatusstatistic, a cada
+# projeto criado, removido ou com status alterado.
+TRIGGERS = {
+    "statistic_project_insert": f"""
+        AFTER INSERT ON project BEGIN
+        INSERT INTO projectstatistic(project_id, task_count,
+            {", ".join(STATUS_COLUMNS.values())}, changed_at, version)
+        VALUES (NEW.id, 0{", 0" * len(STATUS_COLUMNS)}, {NOW}, 1);
+        UPDATE projectstatusstatistic SET total = total + 1, {TOUCH}
+        WHERE status = NEW.status;
+        END""",
+    "statistic_project_update": f"""
+        AFTER UPDATE OF status ON project
+        WHEN OLD.status IS NOT NEW.status BEGIN
+        UPDATE projectstatusstatistic SET total = total - 1, {TOUCH}
+        WHERE status = OLD.status;
+        UPDATE projectstatusstatistic SET total = total + 1, {TOUCH}
+        WHERE status = NEW.status;
+        END""",
+    "statistic_project_touch": f"""
+        AFTER UPDATE ON project BEGIN
+        UPDATE projectstatistic SET {TOUCH}
+        WHERE project_id = NEW.id;
+        END""",
+    "statistic_project_delete": f"""
+        AFTER DELETE ON project BEGIN
+        UPDATE projectstatusstatistic SET total = total - 1, {TOUCH}
+        WHERE status = OLD.status;
+        END""",
+    "statistic_task_insert": f"""
+        AFTER INSERT ON task BEGIN
+        UPDATE projectstatistic SET {_task_delta("NEW", "+")}
+        WHERE project_id = NEW.project_id;
+        INSERT INTO taskstatistic(task_id, project_id, collaborator_count)
+        VALUES (NEW.id, NEW.project_id, 0);
+        END""",
+    "statistic_task_update": f"""
+        AFTER UPDATE OF status, project_id ON task
+        WHEN OLD.status IS NOT NEW.status
+            OR OLD.project_id IS NOT NEW.project_id BEGIN
+        UPDATE projectstatistic SET {_task_delta("OLD", "-")}
+        WHERE project_id = OLD.project_id;
+        UPDATE projectstatistic SET {_task_delta("NEW", "+")}
+        WHERE project_id = NEW.project_id;
+        UPDATE taskstatistic SET project_id = NEW.project_id
+        WHERE task_id = NEW.id;
+        END""",
+    "statistic_task_touch": f"""
+        AFTER UPDATE ON task BEGIN
+        UPDATE projectstatistic SET {TOUCH}
+        WHERE project_id IN (OLD.project_id, NEW.project_id);
+        END""",
+    "statistic_task_delete": f"""
+        AFTER DELETE ON task BEGIN
+        UPDATE projectstatistic SET {_task_delta("OLD", "-")}
+        WHERE project_id = OLD.project_id;
+        END""",
+    "statistic_assignment_insert": """
+        AFTER INSERT ON assignment BEGIN
+        UPDATE taskstatistic SET collaborator_count = collaborator_count + 1
+        WHERE task_id = NEW.task_id;
+        END""",
+    "statistic_assignment_delete": """
+        AFTER DELETE ON assignment BEGIN
+        UPDATE taskstatistic SET collaborator_count = collaborator_count - 1
+        WHERE task_id = OLD.task_id;
+        END""",
+}
+
+
+# Recalcula todos os contadores a partir das tabelas base; corrige qualquer
+# divergência. Deve rodar dentro de uma transação. As linhas existentes são
+# atualizadas (upsert), e não recriadas, para que `version` só cresça: uma
+# ETag antiga nunca volta a valer.
+def rebuild_statistics(connection: Connection) -> None:
+    status_sums = ", ".join(
+        f"coalesce(sum(task.status = '{name}'), 0)"
+        for name in STATUS_COLUMNS)
+    counters = ", ".join(f"{column} = excluded.{column}"
+                         for column in STATUS_COLUMNS.values())
+    touch = "changed_at = excluded.changed_at, version = version + 1"
+    # O WHERE true desfaz a ambiguidade entre o ON da junção e o ON
+    # CONFLICT num INSERT ... SELECT.
+    statements = [
+        """DELETE FROM projectstatistic
+           WHERE project_id NOT IN (SELECT id FROM project)""",
+        "DELETE FROM taskstatistic",
+        *(f"""INSERT INTO projectstatusstatistic(status, total, changed_at,
+                version)
+              SELECT '{name}', count(*), {NOW}, 1 FROM project
+              WHERE status = '{name}'
+              ON CONFLICT(status) DO UPDATE SET total = excluded.total,
+                  {touch}""" for name in STATUS_COLUMNS),
+        f"""INSERT INTO projectstatistic(project_id, task_count,
+                {", ".join(STATUS_COLUMNS.values())}, changed_at, version)
+            SELECT project.id, count(task.id), {status_sums}, {NOW}, 1
+            FROM project LEFT JOIN task ON task.project_id = project.id
+            WHERE true
+            GROUP BY project.id
+            ON CONFLICT(project_id) DO UPDATE SET
+                task_count = excluded.task_count, {counters}, {touch}""",
+        """INSERT INTO taskstatistic(task_id, project_id, collaborator_count)
+           SELECT task.id, task.project_id, count(assignment.task_id)
+           FROM task LEFT JOIN assignment ON assignment.task_id = task.id
+           GROUP BY task.id""",
+    ]
+    for statement in statements:
+        connection.exec_driver_sql(statement)
+
+
+# Recria os triggers (as definições podem ter mudado entre versões) e
+# recalcula os contadores.
+def create_statistics(connection: Connection) -> None:
+    for name, body in TRIGGERS.items():
+        connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS {name}")
+        connection.exec_driver_sql(f"CREATE TRIGGER {name} {body}")
+    rebuild_statistics(connection)
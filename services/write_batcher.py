@@ -0,0 +1,129 @@
+import asyncio
+import os
+
+from sqlalchemy import UpdateBase, event
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from database import DATABASE_URL, async_database_url, register_engine
+
+# Group commit: as escritas de uma linha (api/constraints.execute_write)
+# entram numa fila e um único escritor as grava juntas, uma transação (e um
+# fsync) por lote. Desligado por padrão.
+WRITE_BATCHING = os.getenv("WRITE_BATCHING", "0").lower() in ("1", "true")
+# Quanto o escritor espera por mais escritas depois da primeira do lote;
+# com 0, o lote é só o que se acumulou durante o commit anterior.
+WRITE_BATCH_WINDOW_MS = float(os.getenv("WRITE_BATCH_WINDOW_MS", "2"))
+WRITE_BATCH_MAX_SIZE = int(os.getenv("WRITE_BATCH_MAX_SIZE", "200"))
+
+
+def create_writer_engine() -> AsyncEngine:
+    # Conexão própria do escritor. O pysqlite abre e fecha transações por
+    # conta própria e quebra SAVEPOINT; com isolation_level=None ele não
+    # interfere, e o BEGIN IMMEDIATE (emitido aqui) reserva a escrita logo
+    # no início do lote.
+    engine = create_async_engine(async_database_url(DATABASE_URL),
+                                 poolclass=AsyncAdaptedQueuePool,
+                                 pool_size=1, max_overflow=0)
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def disable_driver_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine.sync_engine, "begin")
+    def begin_immediate(connection):
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+    register_engine(engine.sync_engine, "batch")
+    return engine
+
+
+class WriteBatcher:
+    def __init__(self, window: float, max_size: int):
+        self.engine: AsyncEngine | None = None
+        self.window = window
+        self.max_size = max_size
+        self.queue: asyncio.Queue | None = None
+        self.task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        if self.engine is None:
+            self.engine = create_writer_engine()
+        self.queue = asyncio.Queue()
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        await self.queue.put(None)
+        await self.task
+        await self.engine.dispose()
+
+    # Enfileira a instrução e espera o commit do lote. Devolve a linha do
+    # RETURNING (ou None) ou levanta o erro da própria instrução, ex.:
+    # IntegrityError, sem afetar as demais do lote.
+    async def submit(self, statement: UpdateBase):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((statement, future))
+        return await future
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self.queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_size:
+                try:
+                    if self.queue.empty():
+                        timeout = deadline - loop.time()
+                        if timeout <= 0:
+                            break
+                        item = await asyncio.wait_for(self.queue.get(),
+                                                      timeout)
+                    else:
+                        item = self.queue.get_nowait()
+                except TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._commit(batch)
+
+    # Cada escrita roda num SAVEPOINT: um erro desfaz só ela. Os resultados
+    # são entregues depois do COMMIT; se ele falhar, todas recebem o erro.
+    async def _commit(self, batch: list) -> None:
+        outcomes = []
+        try:
+            async with self.engine.begin() as connection:
+                for statement, future in batch:
+                    if future.cancelled():
+                        continue
+                    try:
+                        async with connection.begin_nested():
+                            result = await connection.execute(statement)
+                            row = (result.mappings().one_or_none()
+                                   if statement.exported_columns else None)
+                    except SQLAlchemyError as error:
+                        outcomes.append((future, None, error))
+                    else:
+                        outcomes.append((future, row, None))
+        except Exception as error:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        for future, row, error in outcomes:
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(row)
+
+
+batcher = (WriteBatcher(WRITE_BATCH_WINDOW_MS / 1000, WRITE_BATCH_MAX_SIZE)
+           if WRITE_BATCHING else None)